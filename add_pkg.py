@@ -10,6 +10,8 @@ from collections.abc import Sequence
 
 from packaging.utils import parse_wheel_filename
 
+import ini
+
 
 def main(argv: Sequence[str] | None = None) -> int:
     parser = argparse.ArgumentParser()
@@ -49,9 +51,8 @@ def main(argv: Sequence[str] | None = None) -> int:
                 name, version, _, _ = parse_wheel_filename(filename)
                 deps.append((name, str(version)))
 
-    cfg = configparser.ConfigParser()
-    assert cfg.read(args.packages_ini)
-    pkgs_latest = dict(k.split("==", 1) for k in cfg.sections())
+    cfg = ini.parse(args.packages_ini)
+    pkgs_latest = dict(k.split("==", 1) for k in cfg)
 
     for name, version in deps:
         key = f"{name}=={version}"
@@ -68,8 +69,11 @@ def main(argv: Sequence[str] | None = None) -> int:
 
         cfg[key] = copy_from
 
+    # configparser is only used to write, format_ini normalizes the output
+    out = configparser.RawConfigParser()
+    out.read_dict(cfg)
     with open(args.packages_ini, "w") as f:
-        cfg.write(f)
+        out.write(f)
 
     subprocess.call((sys.executable, "-m", "format_ini", args.packages_ini))
     return 0
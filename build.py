@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 import argparse
-import configparser
+import concurrent.futures
 import contextlib
 import functools
+import hashlib
 import itertools
 import json
 import os.path
+import pickle
 import platform
 import re
 import shutil
@@ -14,36 +16,87 @@ import subprocess
 import sys
 import tarfile
 import tempfile
+import time
+import urllib.error
 import urllib.parse
 import urllib.request
 import zipfile
 from collections.abc import Callable
 from collections.abc import Generator
+from collections.abc import Iterable
 from collections.abc import Mapping
 from collections.abc import MutableMapping
+from collections.abc import Sequence
+from typing import Any
 from typing import ContextManager
 from typing import NamedTuple
+from typing import TypeVar
 
+import packaging
+from packaging.specifiers import InvalidSpecifier
 from packaging.specifiers import SpecifierSet
 from packaging.tags import compatible_tags
 from packaging.tags import cpython_tags
 from packaging.tags import platform_tags
 from packaging.tags import Tag
+from packaging.utils import canonicalize_name
+from packaging.utils import InvalidSdistFilename
+from packaging.utils import InvalidWheelFilename
+from packaging.utils import parse_sdist_filename
 from packaging.utils import parse_wheel_filename
 from packaging.version import Version
 
+import caching
+import ini
+
+T = TypeVar("T")
+
 PYTHONS = ((3, 11), (3, 12), (3, 13))
 
+PYPI_SIMPLE = "https://pypi.org/simple"
+
 BINARY_EXTS = frozenset(
     (".c", ".cc", ".cpp", ".cxx", ".pxd", ".pxi", ".pyx", ".go", ".rs")
 )
+BINARY_EXTS_TUPLE = tuple(BINARY_EXTS)  # for `str.endswith`
 
-DATA_SCRIPTS = re.compile(r"^[^/]+.data/scripts/[^/]+(?<!\.py)$")
+_NO_TAGS: frozenset[Tag] = frozenset()
 
+# these are pure and see many repeated inputs (`python_versions = <3.13`, ...)
+_parse_sdist_filename = functools.cache(parse_sdist_filename)
+_parse_wheel_filename = functools.cache(parse_wheel_filename)
+_specifier_set = functools.cache(SpecifierSet)
+_version = functools.cache(Version)
 
-def _supported_tags(version: tuple[int, int]) -> frozenset[Tag]:
+
+def _pickle_cached(filename: str, key: object, func: Callable[[], T]) -> T:
+    cache_path = os.path.join(caching.cache_dir(), filename)
+    try:
+        with open(cache_path, "rb") as f:
+            cached_key, cached = pickle.load(f)
+    except Exception:
+        # missing, truncated, or pickled against other versions of our deps
+        pass
+    else:
+        if cached_key == key:
+            return cached
+
+    ret = func()
+
+    caching.write_atomic(cache_path, pickle.dumps((key, ret), protocol=5))
+
+    return ret
+
+
+@functools.lru_cache(maxsize=1)
+def _platforms() -> tuple[str, ...]:
     # ignore the generic `linux_x86_64` / `linux_aarch64` tags
-    platforms = [plat for plat in platform_tags() if not plat.startswith("linux_")]
+    return tuple(plat for plat in platform_tags() if not plat.startswith("linux_"))
+
+
+@functools.cache
+def _supported_tags(version: tuple[int, int]) -> frozenset[Tag]:
+    platforms = _platforms()
     return frozenset(
         (
             *cpython_tags(version, platforms=platforms),
@@ -65,6 +118,42 @@ class Python(NamedTuple):
         return "python{}.{}".format(*self.version)
 
 
+def _pythons(*, cache: bool = False) -> list[Python]:
+    def _compute() -> list[Python]:
+        return [Python(version, _supported_tags(version)) for version in PYTHONS]
+
+    if not cache:
+        return _compute()
+
+    # the supported tags only change with the host (or packaging) -- including
+    # the running interpreter, `compatible_tags` adds its `cpXY-none-any`
+    key = (
+        PYTHONS,
+        sys.implementation.cache_tag,
+        sys.platform,
+        platform.machine(),
+        platform.mac_ver()[0],
+        platform.libc_ver(),
+        packaging.__version__,
+    )
+    return _pickle_cached("pythons.pkl", key, _compute)
+
+
+PACKAGE_KEYS = frozenset(
+    (
+        "apt_requires",
+        "brew_requires",
+        "custom_prebuild",
+        "likely_binary_ignore",
+        "python_versions",
+        # validate-only settings (ignored here)
+        "validate_extras",
+        "validate_incorrect_missing_deps",
+        "validate_skip_imports",
+    )
+)
+
+
 class Package(NamedTuple):
     name: str
     version: Version
@@ -76,73 +165,204 @@ class Package(NamedTuple):
 
     def satisfied_by(
         self,
-        wheels: dict[str, list[tuple[Version, frozenset[Tag]]]],
+        wheels: dict[tuple[str, Version], frozenset[Tag]],
         tags: frozenset[Tag],
     ) -> bool:
-        for version, wheel_tags in wheels.get(self.name, ()):
-            if version == self.version and wheel_tags & tags:
-                return True
-        else:
-            return False
+        return bool(wheels.get((self.name, self.version), _NO_TAGS) & tags)
 
     @classmethod
     def make(cls, key: str, val: Mapping[str, str]) -> Package:
         name, version_s = key.split("==", 1)
 
-        dct = dict(val)
-        apt_requires = tuple(dct.pop("apt_requires", "").split())
-        brew_requires = tuple(dct.pop("brew_requires", "").split())
-        custom_prebuild = tuple(dct.pop("custom_prebuild", "").split())
-        likely_binary_ignore = tuple(dct.pop("likely_binary_ignore", "").split())
-        python_versions = dct.pop("python_versions", "")
-        # ignore validate-only settings
-        for setting in (
-            "validate_extras",
-            "validate_incorrect_missing_deps",
-            "validate_skip_imports",
-        ):
-            dct.pop(setting, None)
-        if dct:
-            raise ValueError(f"unexpected attrs for {key}: {sorted(dct)}")
+        unexpected = val.keys() - PACKAGE_KEYS
+        if unexpected:
+            raise ValueError(f"unexpected attrs for {key}: {sorted(unexpected)}")
 
         return cls(
             name=name,
-            version=Version(version_s),
-            apt_requires=apt_requires,
-            brew_requires=brew_requires,
-            custom_prebuild=custom_prebuild,
-            likely_binary_ignore=likely_binary_ignore,
-            python_versions=SpecifierSet(python_versions),
+            version=_version(version_s),
+            apt_requires=tuple(val.get("apt_requires", "").split()),
+            brew_requires=tuple(val.get("brew_requires", "").split()),
+            custom_prebuild=tuple(val.get("custom_prebuild", "").split()),
+            likely_binary_ignore=tuple(val.get("likely_binary_ignore", "").split()),
+            python_versions=_specifier_set(val.get("python_versions", "")),
         )
 
 
-def _add_wheel(d: dict[str, list[tuple[Version, frozenset[Tag]]]], f: str) -> None:
-    name, version, _, tags = parse_wheel_filename(f)
-    d.setdefault(name, []).append((version, tags))
+def _load_packages(packages_ini: str, *, cache: bool = False) -> list[Package]:
+    if not cache:
+        return [Package.make(k, v) for k, v in ini.parse(packages_ini).items()]
 
+    # keyed on file identity (and `Package` / `packaging` layout) -- skips
+    # parsing entirely
+    st = os.stat(packages_ini)
+    key = (
+        os.path.abspath(packages_ini),
+        st.st_mtime_ns,
+        st.st_size,
+        Package._fields,
+        packaging.__version__,
+    )
+    return _pickle_cached(
+        "packages.pkl", key, functools.partial(_load_packages, packages_ini)
+    )
 
-def _internal_wheels(index: str) -> dict[str, list[tuple[Version, frozenset[Tag]]]]:
-    # dumb-pypi specific `packages.json` endpoint
-    resp = urllib.request.urlopen(urllib.parse.urljoin(index, "packages.json"))
-    ret: dict[str, list[tuple[Version, frozenset[Tag]]]] = {}
-    for line in resp:
-        _add_wheel(ret, json.loads(line)["filename"])
+
+def _add_wheel(d: dict[tuple[str, Version], frozenset[Tag]], f: str) -> None:
+    # all wheels for a (name, version) are merged into a single set of tags
+    name, version, _, tags = _parse_wheel_filename(f)
+    d[(name, version)] = d.get((name, version), _NO_TAGS) | tags
+
+
+def _parse_internal_wheels(
+    contents: bytes,
+    names: frozenset[str] | None,
+) -> dict[tuple[str, Version], frozenset[Tag]]:
+    ret: dict[tuple[str, Version], frozenset[Tag]] = {}
+    # read in one go rather than line-by-line off the socket
+    for info in caching.json_lines(contents):
+        filename = info["filename"]
+        # skip the (comparatively expensive) filename parse for unknown packages
+        if (
+            names is not None
+            and canonicalize_name(filename.partition("-")[0]) not in names
+        ):
+            continue
+        _add_wheel(ret, filename)
     return ret
 
 
-def _darwin_setup_deps(packages_ini: str, dest: str, pypi_url: str) -> None:
+def _internal_wheels(
+    index: str,
+    names: frozenset[str] | None = None,
+    *,
+    cache: bool = False,
+) -> dict[tuple[str, Version], frozenset[Tag]]:
+    # dumb-pypi specific `packages.json` endpoint
+    url = urllib.parse.urljoin(index, "packages.json")
+    contents = caching.fetch(url, cache=cache)
+    if not cache:
+        return _parse_internal_wheels(contents, names)
+
+    # an unchanged (revalidated) packages.json skips parsing the filenames
+    key = (url, hashlib.sha256(contents).digest(), names, packaging.__version__)
+    return _pickle_cached(
+        "internal_wheels.pkl",
+        key,
+        functools.partial(_parse_internal_wheels, contents, names),
+    )
+
+
+ELF_MACHINES = {0x3E: "x86_64", 0xB7: "aarch64"}
+MACHO_CPU_TYPES = {0x01000007: "x86_64", 0x0100000C: "arm64"}
+
+
+def _elf_archs(header: bytes) -> set[str] | None:
+    if not header.startswith(b"\x7fELF") or len(header) < 20:
+        return None
+
+    # EI_DATA: 1 is little endian, 2 is big endian
+    if header[5] == 1:
+        machine = int.from_bytes(header[18:20], "little")
+    else:
+        machine = int.from_bytes(header[18:20], "big")
+    arch = ELF_MACHINES.get(machine)
+    return None if arch is None else {arch}
+
+
+def _macho_archs(header: bytes) -> set[str] | None:
+    magic = header[:4]
+    if magic in (b"\xca\xfe\xba\xbe", b"\xca\xfe\xba\xbf"):  # fat / fat64
+        entry_size = 20 if magic == b"\xca\xfe\xba\xbe" else 32
+        count = int.from_bytes(header[4:8], "big")
+        if not 0 < count <= (len(header) - 8) // entry_size:
+            return None
+
+        archs = set()
+        for i in range(count):
+            pos = 8 + i * entry_size
+            arch = MACHO_CPU_TYPES.get(int.from_bytes(header[pos : pos + 4], "big"))
+            if arch is None:
+                return None
+            archs.add(arch)
+        return archs
+    elif magic in (b"\xce\xfa\xed\xfe", b"\xcf\xfa\xed\xfe"):  # thin, LE
+        arch = MACHO_CPU_TYPES.get(int.from_bytes(header[4:8], "little"))
+        return None if arch is None else {arch}
+    else:
+        return None
+
+
+def _archs_from_header(header: bytes) -> set[str] | None:
+    # returns `None` for anything not understood
+    return _elf_archs(header) or _macho_archs(header)
+
+
+def _env_with(**overrides: str) -> dict[str, str]:
+    # not snapshotted at import: `_brew_install` / `_prebuild` modify os.environ
+    env = os.environ.copy()
+    env.update(overrides)
+    return env
+
+
+@contextlib.contextmanager
+def _env_updated(
+    env: MutableMapping[str, str],
+    overrides: Mapping[str, str],
+) -> Generator[None, None, None]:
+    # only save / restore the touched keys rather than copying everything
+    before = {k: env.get(k) for k in overrides}
+    env.update(overrides)
+    try:
+        yield
+    finally:
+        for k, v in before.items():
+            if v is None:
+                env.pop(k, None)
+            else:
+                env[k] = v
+
+
+def _merged(requires: Iterable[tuple[str, ...]]) -> tuple[str, ...]:
+    # de-duplicated, in first-seen order
+    return tuple(dict.fromkeys(itertools.chain.from_iterable(requires)))
+
+
+def _darwin_setup_deps(
+    packages_ini: str,
+    dest: str,
+    pypi_url: str,
+    reuse_container: bool,
+    build_args: tuple[str, ...],
+) -> None:
     """darwin requires no setup"""
 
 
+def _brew_cellar() -> str:
+    if os.environ.get("HOMEBREW_CELLAR"):
+        return os.environ["HOMEBREW_CELLAR"]
+    elif platform.machine() == "arm64":
+        return "/opt/homebrew/Cellar"
+    else:
+        return "/usr/local/Cellar"
+
+
 def _darwin_installed_packages() -> frozenset[str]:
+    # the cellar has a directory per installed formula -- much cheaper than
+    # having brew produce (and us parse) json for everything installed
+    cellar = _brew_cellar()
+    if os.path.isdir(cellar):
+        return frozenset(os.listdir(cellar))
+
     cmd = ("brew", "info", "--json=v1", "--installed")
     contents = json.loads(subprocess.check_output(cmd))
     return frozenset(pkg["name"] for pkg in contents)
 
 
-def _brew_paths(*pkgs: str) -> list[str]:
+@functools.cache
+def _brew_paths(*pkgs: str) -> tuple[str, ...]:
     cmd = ("brew", "--prefix", *pkgs)
-    return subprocess.check_output(cmd).decode().splitlines()
+    return tuple(subprocess.check_output(cmd).decode().splitlines())
 
 
 @contextlib.contextmanager
@@ -151,7 +371,7 @@ def _brew_install(packages: tuple[str, ...]) -> Generator[None, None, None]:
 
     subprocess.check_call(
         ("brew", "install", *packages, "--overwrite"),
-        env={**os.environ, "HOMEBREW_NO_AUTO_UPDATE": "1"},
+        env=_env_with(HOMEBREW_NO_AUTO_UPDATE="1"),
     )
 
     # add the brew installed things to environment
@@ -160,19 +380,16 @@ def _brew_install(packages: tuple[str, ...]) -> Generator[None, None, None]:
     def _paths(*parts: str) -> list[str]:
         return [os.path.join(path, *parts) for path in pkg_paths]
 
-    orig = dict(os.environ)
-    os.environ.update(
-        CPPFLAGS=" ".join(f"-I{path}" for path in _paths("include")),
-        LDFLAGS=" ".join(f"-L{path}" for path in _paths("lib")),
-        PKG_CONFIG_PATH=":".join(_paths("lib", "pkgconfig")),
-    )
+    overrides = {
+        "CPPFLAGS": " ".join(f"-I{path}" for path in _paths("include")),
+        "LDFLAGS": " ".join(f"-L{path}" for path in _paths("lib")),
+        "PKG_CONFIG_PATH": ":".join(_paths("lib", "pkgconfig")),
+    }
 
     try:
-        yield
+        with _env_updated(os.environ, overrides):
+            yield
     finally:
-        os.environ.clear()
-        os.environ.update(orig)
-
         newly_installed = _darwin_installed_packages() - installed_before
         if newly_installed:
             purge_cmd = ("brew", "uninstall", *newly_installed)
@@ -180,10 +397,11 @@ def _brew_install(packages: tuple[str, ...]) -> Generator[None, None, None]:
 
 
 @contextlib.contextmanager
-def _darwin_install(package: Package) -> Generator[None, None, None]:
+def _darwin_install(packages: Sequence[Package]) -> Generator[None, None, None]:
+    brew_requires = _merged(package.brew_requires for package in packages)
     with contextlib.ExitStack() as ctx:
-        if package.brew_requires:
-            ctx.enter_context(_brew_install(package.brew_requires))
+        if brew_requires:
+            ctx.enter_context(_brew_install(brew_requires))
         yield
 
 
@@ -210,6 +428,7 @@ PLAT_MAP = {"x86_64": "amd64", "aarch64": "arm64", "arm64": "arm64"}
 IMAGE_NAME = f"ghcr.io/getsentry/pypi-manylinux-{PLAT_MAP[platform.machine()]}-ci"
 
 
+@functools.cache
 def _docker_run() -> tuple[str, ...]:
     if shutil.which("podman"):
         return ("podman", "run")
@@ -217,9 +436,109 @@ def _docker_run() -> tuple[str, ...]:
         return ("docker", "run", "--user", f"{os.getuid()}:{os.getgid()}")
 
 
-def _linux_setup_deps(packages_ini: str, dest: str, pypi_url: str) -> None:
+def _container_cache_args() -> tuple[str, ...]:
+    # the host's cache dir: `--cache` would otherwise go away with the container
+    cache_dir = caching.cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    return (
+        f"--volume={cache_dir}:/cache/pypi-build:rw",
+        "--env=XDG_CACHE_HOME=/cache",
+    )
+
+
+CONTAINER_NAME = "pypi-build"
+CONTAINER_KEY_LABEL = "pypi-build.key"
+CONTAINER_STATE_FORMAT = '{{.State.Running}} {{index .Config.Labels "pypi-build.key"}}'
+
+
+def _linux_exec_in_reused_container(
+    packages_ini: str, dest: str, pypi_url: str, build_args: tuple[str, ...]
+) -> None:
+    # without a tty `exec` does not forward signals: an interrupted build
+    # would carry on inside the container (and race the next one)
+    if not sys.stdin.isatty():
+        raise SystemExit("--reuse-container requires a tty")
+
+    docker = _docker_run()[0]
+
+    # directories (not files) are mounted so edits are seen by a reused container
+    packages_ini = os.path.abspath(packages_ini)
+    volumes = (
+        f"--volume={os.path.dirname(packages_ini)}:/packages:ro",
+        f"--volume={os.path.abspath(dest)}:/dist:rw",
+        f"--volume={os.path.dirname(os.path.abspath(__file__))}:/src:ro",
+        *_container_cache_args(),
+    )
+
+    # always pull: the container is only reused while it runs the latest image
+    subprocess.check_call(
+        (docker, "pull", "--quiet", IMAGE_NAME), stdout=subprocess.DEVNULL
+    )
+    image_cmd = (docker, "image", "inspect", "--format={{.Id}}", IMAGE_NAME)
+    image_id = subprocess.check_output(image_cmd).decode().strip()
+    key = hashlib.sha256("\0".join((image_id, *volumes)).encode()).hexdigest()
+
+    # a single container (replaced when stale) so they don't pile up
+    inspect_cmd = (
+        docker,
+        "inspect",
+        f"--format={CONTAINER_STATE_FORMAT}",
+        CONTAINER_NAME,
+    )
+    inspect = subprocess.run(inspect_cmd, capture_output=True)
+    if inspect.returncode != 0 or inspect.stdout.decode().strip() != f"true {key}":
+        subprocess.run(
+            (docker, "rm", "--force", CONTAINER_NAME),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        print("starting container...")
+        subprocess.check_call(
+            (
+                *_docker_run(),
+                "--rm",
+                "--detach",
+                f"--name={CONTAINER_NAME}",
+                f"--label={CONTAINER_KEY_LABEL}={key}",
+                *volumes,
+                "--workdir=/src",
+                image_id,
+                "sleep",
+                "infinity",
+            ),
+            stdout=subprocess.DEVNULL,
+        )
+
+    print("execing into container...")
+    cmd = (
+        docker,
+        "exec",
+        "--interactive",
+        "--tty",
+        CONTAINER_NAME,
+        "python3",
+        "-um",
+        "build",
+        "--dest=/dist",
+        f"--packages-ini=/packages/{os.path.basename(packages_ini)}",
+        f"--pypi-url={pypi_url}",
+        *build_args,
+    )
+    os.execvp(cmd[0], cmd)
+
+
+def _linux_setup_deps(
+    packages_ini: str,
+    dest: str,
+    pypi_url: str,
+    reuse_container: bool,
+    build_args: tuple[str, ...],
+) -> None:
     if os.environ.get("BUILD_IN_CONTAINER"):
         return
+    elif reuse_container:
+        _linux_exec_in_reused_container(packages_ini, dest, pypi_url, build_args)
+        return
 
     print("execing into container...")
     cmd = (
@@ -229,6 +548,7 @@ def _linux_setup_deps(packages_ini: str, dest: str, pypi_url: str) -> None:
         f"--volume={os.path.abspath(packages_ini)}:/packages.ini:ro",
         f"--volume={os.path.abspath(dest)}:/dist:rw",
         f"--volume={os.path.dirname(os.path.abspath(__file__))}:/src:ro",
+        *_container_cache_args(),
         "--workdir=/src",
         IMAGE_NAME,
         "python3",
@@ -237,26 +557,74 @@ def _linux_setup_deps(packages_ini: str, dest: str, pypi_url: str) -> None:
         "--dest=/dist",
         "--packages-ini=/packages.ini",
         f"--pypi-url={pypi_url}",
+        *build_args,
     )
     os.execvp(cmd[0], cmd)
 
 
+APT_LISTS = "/var/lib/apt/lists"
+APT_UPDATE_TTL = 60 * 60
+
+
+def _apt_lists_age() -> float | None:
+    # the image removes the lists, so they are only present after an update.
+    # ctime rather than mtime: apt sets the latter from the server
+    try:
+        ctimes = [
+            entry.stat().st_ctime
+            for entry in os.scandir(APT_LISTS)
+            if "_Packages" in entry.name
+        ]
+    except OSError:
+        return None
+    else:
+        return time.time() - max(ctimes) if ctimes else None
+
+
 @functools.lru_cache(maxsize=1)  # only run once!
 def _apt_update() -> None:
+    # also skip it if another recent invocation already updated
+    age = _apt_lists_age()
+    if age is not None and age < APT_UPDATE_TTL:
+        return
+
     subprocess.check_call(("apt-get", "update", "-qq"))
 
 
+DPKG_INFO = "/var/lib/dpkg/info"
+
+
 def _linux_installed_packages() -> frozenset[str]:
+    # dpkg keeps a `{package}.list` file per installed package
+    if os.path.isdir(DPKG_INFO):
+        return frozenset(
+            name.removesuffix(".list")
+            for name in os.listdir(DPKG_INFO)
+            if name.endswith(".list")
+        )
+
     cmd = ("dpkg-query", "--show", "--showformat", "${binary:Package}\n")
     return frozenset(subprocess.check_output(cmd).decode().splitlines())
 
 
 @contextlib.contextmanager
 def _apt_install(packages: tuple[str, ...]) -> Generator[None, None, None]:
-    _apt_update()
-
     installed_before = _linux_installed_packages()
 
+    # nothing would be installed (or purged): skip `apt-get` entirely.  only
+    # plain names are checked (satisfied by any installed version / arch):
+    # version (`pkg=1.2`), release (`pkg/stable`) or arch (`pkg:i386`)
+    # qualified requirements are always left to apt
+    # multi-arch packages are listed as `{package}:{arch}`
+    installed_names = {pkg.partition(":")[0] for pkg in installed_before}
+    if not any(c in pkg for pkg in packages for c in "=/:") and (
+        installed_names.issuperset(packages)
+    ):
+        yield
+        return
+
+    _apt_update()
+
     subprocess.check_call(
         (
             "apt-get",
@@ -265,7 +633,7 @@ def _apt_install(packages: tuple[str, ...]) -> Generator[None, None, None]:
             "--no-install-recommends",
             *packages,
         ),
-        env={**os.environ, "DEBIAN_FRONTEND": "noninteractive"},
+        env=_env_with(DEBIAN_FRONTEND="noninteractive"),
         stderr=subprocess.DEVNULL,
         stdout=subprocess.DEVNULL,
     )
@@ -280,10 +648,11 @@ def _apt_install(packages: tuple[str, ...]) -> Generator[None, None, None]:
 
 
 @contextlib.contextmanager
-def _linux_install(package: Package) -> Generator[None, None, None]:
+def _linux_install(packages: Sequence[Package]) -> Generator[None, None, None]:
+    apt_requires = _merged(package.apt_requires for package in packages)
     with contextlib.ExitStack() as ctx:
-        if package.apt_requires:
-            ctx.enter_context(_apt_install(package.apt_requires))
+        if apt_requires:
+            ctx.enter_context(_apt_install(apt_requires))
         yield
 
 
@@ -315,8 +684,8 @@ def _linux_repair_wheel(filename: str, dest: str) -> None:
 
 
 class Platform(NamedTuple):
-    setup_deps: Callable[[str, str, str], None]
-    install: Callable[[Package], ContextManager[None]]
+    setup_deps: Callable[[str, str, str, bool, tuple[str, ...]], None]
+    install: Callable[[Sequence[Package]], ContextManager[None]]
     get_archs: Callable[[str], set[str]]
     repair_wheel: Callable[[str, str], None]
 
@@ -338,51 +707,86 @@ plats = {
 plat = plats[sys.platform]
 
 
-def _expected_archs_for_wheel(filename: str) -> set[str]:
-    archs = set()
-    parts = os.path.splitext(os.path.basename(filename))[0].split("-")
-    for plat in parts[-1].split("."):
+PLAT_ARCHS = {
+    "intel": frozenset(("x86_64",)),  # macos
+    "universal2": frozenset(("x86_64", "arm64")),  # macos
+    "aarch64": frozenset(("aarch64",)),
+    "arm64": frozenset(("arm64",)),
+    "x86_64": frozenset(("x86_64",)),
+}
+PLAT_ARCH_RE = re.compile(rf'_({"|".join(PLAT_ARCHS)})$')
+
+
+@functools.cache
+def _expected_archs_for_plats(plats: str) -> frozenset[str]:
+    archs: set[str] = set()
+    for plat in plats.split("."):
         if plat == "any":
             continue
-        elif plat.endswith("_intel"):  # macos
-            archs.add("x86_64")
-        elif plat.endswith("_universal2"):  # macos
-            archs.update(("x86_64", "arm64"))
-        else:
-            for arch in ("aarch64", "arm64", "x86_64"):
-                if plat.endswith(f"_{arch}"):
-                    archs.add(arch)
-                    break
-            else:
-                raise AssertionError(f"unexpected {plat=}")
 
-    return archs
+        match = PLAT_ARCH_RE.search(plat)
+        if match is None:
+            raise AssertionError(f"unexpected {plat=}")
+        archs.update(PLAT_ARCHS[match[1]])
+
+    return frozenset(archs)
+
+
+def _expected_archs_for_wheel(filename: str) -> frozenset[str]:
+    # the platform tag(s) are the last `-` separated part of the filename
+    basename = os.path.basename(filename)
+    return _expected_archs_for_plats(basename.removesuffix(".whl").rpartition("-")[2])
+
+
+def _is_data_script(name: str) -> bool:
+    # `{dist}.data/scripts/{script}` -- python scripts aren't binaries
+    dist, sep, script = name.partition(".data/scripts/")
+    return (
+        bool(sep)
+        and bool(dist)
+        and "/" not in dist
+        and bool(script)
+        and "/" not in script
+        and not script.endswith(".py")
+    )
 
 
 def _check_arch(filename: str) -> str | None:
-    with tempfile.TemporaryDirectory() as tmpdir:
-        archdir = os.path.join(tmpdir, "arch")
-        with zipfile.ZipFile(filename) as zipf:
-            arch_files = []
-            for name in zipf.namelist():
-                if "/tests/" in name:
-                    continue
-                elif name.endswith((".so", ".dylib")) or ".so." in name:
-                    arch_files.append(name)
-                elif DATA_SCRIPTS.match(name):
-                    with zipf.open(name) as f:
-                        if f.read(2) != b"#!":
-                            arch_files.append(name)
-
-            for arch_file in arch_files:
-                zipf.extract(arch_file, archdir)
-
-        archs = _expected_archs_for_wheel(filename)
-        for arch_file in arch_files:
-            archs_for_file = plat.get_archs(os.path.join(archdir, arch_file))
+    archs = _expected_archs_for_wheel(filename)
+    if not archs:
+        # platform `any`: no architecture can mismatch, skip reading the wheel
+        return None
+
+    with contextlib.ExitStack() as ctx:
+        zipf = ctx.enter_context(zipfile.ZipFile(filename))
+        tmpdir = None
+
+        for name in zipf.namelist():
+            if "/tests/" in name:
+                continue
+            elif name.endswith((".so", ".dylib")) or ".so." in name:
+                is_script = False
+            elif _is_data_script(name):
+                is_script = True
+            else:
+                continue
+
+            # the architecture is in the first few bytes, no need to extract
+            with zipf.open(name) as f:
+                header = f.read(4096)
+            if is_script and header.startswith(b"#!"):
+                continue
+
+            archs_for_file = _archs_from_header(header)
+            if archs_for_file is None:
+                # not understood from the header alone, defer to `file` / `otool`
+                if tmpdir is None:
+                    tmpdir = ctx.enter_context(tempfile.TemporaryDirectory())
+                archs_for_file = plat.get_archs(zipf.extract(name, tmpdir))
+
             if (archs & archs_for_file) != archs:
                 return (
-                    f"-> {arch_file} has mismatched architectures\n"
+                    f"-> {name} has mismatched architectures\n"
                     f'---> expected {", ".join(sorted(archs))}\n'
                     f'---> received {", ".join(sorted(archs_for_file))}\n'
                 )
@@ -390,35 +794,167 @@ def _check_arch(filename: str) -> str | None:
     return None
 
 
-def _download(package: Package, python: Python, dest: str) -> str | None:
-    with tempfile.TemporaryDirectory() as tmpdir:
-        pip = (python.exe, "-mpip")
+def _only_file(dirname: str) -> str:
+    # the directory is expected to contain exactly one file
+    with os.scandir(dirname) as it:
+        (entry,) = it
+        return entry.path
+
+
+@functools.cache
+def _fetch_pypi_files(name: str) -> tuple[dict[str, Any], ...]:
+    # PEP 691 json simple api, shared between the pythons for a package
+    req = urllib.request.Request(
+        f"{PYPI_SIMPLE}/{name}/",
+        headers={"Accept": "application/vnd.pypi.simple.v1+json"},
+    )
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return tuple(json.load(resp)["files"])
+    except urllib.error.HTTPError as e:
+        if e.code == 404:  # not on pypi: that won't change during the run
+            return ()
+        else:
+            raise
+
+
+def _pypi_files(name: str) -> tuple[dict[str, Any], ...]:
+    try:
+        return _fetch_pypi_files(name)
+    except (urllib.error.URLError, OSError):
+        # transient (raised, so not cached): unknown for now
+        return ()
+
+
+def _pypi_may_have_wheel(package: Package, python: Python) -> bool:
+    files = _pypi_files(package.name)
+    if not files:  # unknown (or the request failed): let pip decide
+        return True
+
+    for file in files:
+        try:
+            _, version, _, tags = _parse_wheel_filename(file["filename"])
+        except InvalidWheelFilename:
+            continue
+        if version == package.version and tags & python.tags:
+            return True
+    else:
+        return False
+
+
+def _pip_download(package: Package, python: Python, dest_dir: str) -> str | None:
+    # skip starting pip (and its resolver) when there is nothing to download
+    if not _pypi_may_have_wheel(package, python):
+        return None
+    elif subprocess.call(
+        (
+            python.exe,
+            "-mpip",
+            "download",
+            f"--dest={dest_dir}",
+            f"--index-url={PYPI_SIMPLE}",
+            "--no-deps",
+            "--only-binary=:all:",
+            f"{package.name}=={package.version}",
+        ),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    ):
+        return None
+    else:
+        return _only_file(dest_dir)
+
+
+def _purelib_matches(file: dict[str, Any], package: Package, python: Python) -> bool:
+    if not file["filename"].endswith(".whl"):
+        return False
+
+    try:
+        _, version, _, tags = _parse_wheel_filename(file["filename"])
+    except InvalidWheelFilename:
+        return False
+
+    if (
+        version != package.version
+        or not tags & python.tags
+        or any(tag.platform != "any" for tag in tags)
+    ):
+        return False
+
+    requires_python = file.get("requires-python")
+    if not requires_python:
+        return True
+
+    try:
+        return python.version_string in SpecifierSet(requires_python)
+    except InvalidSpecifier:  # pip ignores these too
+        return True
+
+
+def _download_file(file: dict[str, Any], dest_dir: str) -> str:
+    filename_full = os.path.join(dest_dir, file["filename"])
+    sha256 = hashlib.sha256()
+    with urllib.request.urlopen(file["url"]) as resp:
+        with open(filename_full, "wb") as f:
+            for chunk in iter(lambda: resp.read(1 << 16), b""):
+                sha256.update(chunk)
+                f.write(chunk)
+
+    expected = file.get("hashes", {}).get("sha256")
+    if expected is not None and sha256.hexdigest() != expected:
+        raise AssertionError(f"{file['filename']}: sha256 mismatch")
+    return filename_full
+
+
+def _download_purelib(package: Package, python: Python, dest_dir: str) -> str | None:
+    # equivalent to `pip download --platform=any ...` without another pip startup
+    for file in _pypi_files(package.name):
+        if _purelib_matches(file, package, python):
+            return _download_file(file, dest_dir)
+    else:
+        return None
+
+
+def _sdist_matches(file: dict[str, Any], package: Package) -> bool:
+    try:
+        _, version = _parse_sdist_filename(file["filename"])
+    except InvalidSdistFilename:
+        return False
+    else:
+        return version == package.version
 
+
+def _download_sdist(package: Package, dest_dir: str) -> str | None:
+    # unlike `pip download --no-binary` this does not prepare metadata, so it
+    # neither needs a python nor the package's system requirements
+    for file in _pypi_files(package.name):
+        if _sdist_matches(file, package):
+            os.makedirs(dest_dir, exist_ok=True)
+            return _download_file(file, dest_dir)
+    else:
+        return None
+
+
+def _download(
+    package: Package,
+    python: Python,
+    dest: str,
+    *,
+    log: Callable[[str], None] = print,
+) -> str | None:
+    with tempfile.TemporaryDirectory() as tmpdir:
         # first try to download the architecture-specific wheel
         # it may be invalidated due to being packaged for the wrong arch
         # in that case we'll try to additionally download a purelib wheel
-        for opt in ((), ("--platform=any",)):
-            if not subprocess.call(
-                (
-                    *pip,
-                    "download",
-                    f"--dest={tmpdir}",
-                    "--index-url=https://pypi.org/simple",
-                    "--no-deps",
-                    "--only-binary=:all:",
-                    *opt,
-                    f"{package.name}=={package.version}",
-                ),
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-            ):
-                (filename,) = os.listdir(tmpdir)
-                filename_full = os.path.join(tmpdir, filename)
+        for download in (_pip_download, _download_purelib):
+            filename_full = download(package, python, tmpdir)
+            if filename_full is not None:
+                filename = os.path.basename(filename_full)
 
                 arch_reason = _check_arch(filename_full)
                 if arch_reason is not None:
                     os.remove(filename_full)
-                    print(f"-> ignoring: {filename}\n{arch_reason}")
+                    log(f"-> ignoring: {filename}\n{arch_reason}")
                     continue
                 else:
                     shutil.copy(filename_full, dest)
@@ -427,6 +963,23 @@ def _download(package: Package, python: Python, dest: str) -> str | None:
             return None
 
 
+def _download_pythons(
+    package: Package, pythons: list[Python], dest: str
+) -> dict[tuple[int, int], tuple[str | None, list[str]]]:
+    # runs on a worker thread: output is collected for `main` to print in order
+    downloaded: dict[tuple[str, Version], frozenset[Tag]] = {}
+    ret = {}
+    for python in pythons:
+        # a wheel downloaded for a previous python (purelib / abi3) may suffice
+        if not package.satisfied_by(downloaded, python.tags):
+            output: list[str] = []
+            filename = _download(package, python, dest, log=output.append)
+            if filename is not None:
+                _add_wheel(downloaded, filename)
+            ret[python.version] = (filename, output)
+    return ret
+
+
 def _join_env(
     *,
     name: str,
@@ -456,85 +1009,68 @@ def _prebuild(
         prefix = os.path.join(tmpdir, "prefix")
         os.makedirs(prefix, exist_ok=True)
 
-        def _prefix_path(*parts: str) -> str:
-            return os.path.join(prefix, *parts)
+        bin_dir = os.path.join(prefix, "bin")
+        include_dir = os.path.join(prefix, "include")
+        lib_dir = os.path.join(prefix, "lib")
+        pkgconfig_dir = os.path.join(lib_dir, "pkgconfig")
 
         subprocess.check_call((*package.custom_prebuild, prefix))
-        before = {**env}
-        env.update(
-            PATH=_join_env(
-                name="PATH",
-                value=_prefix_path("bin"),
-                sep=os.pathsep,
-                env=env,
+        overrides = {
+            "PATH": _join_env(name="PATH", value=bin_dir, sep=os.pathsep, env=env),
+            "CPPFLAGS": _join_env(
+                name="CPPFLAGS", value=f"-I{include_dir}", sep=" ", env=env
             ),
-            CPPFLAGS=_join_env(
-                name="CPPFLAGS",
-                value=f"-I{_prefix_path('include')}",
-                sep=" ",
-                env=env,
+            "LDFLAGS": _join_env(
+                name="LDFLAGS", value=f"-L{lib_dir}", sep=" ", env=env
             ),
-            LDFLAGS=_join_env(
-                name="LDFLAGS",
-                value=f"-L{_prefix_path('lib')}",
-                sep=" ",
-                env=env,
+            "LD_LIBRARY_PATH": _join_env(
+                name="LD_LIBRARY_PATH", value=lib_dir, sep=os.pathsep, env=env
             ),
-            LD_LIBRARY_PATH=_join_env(
-                name="LD_LIBRARY_PATH",
-                value=_prefix_path("lib"),
-                sep=os.pathsep,
-                env=env,
+            "PKG_CONFIG_PATH": _join_env(
+                name="PKG_CONFIG_PATH", value=pkgconfig_dir, sep=os.pathsep, env=env
             ),
-            PKG_CONFIG_PATH=_join_env(
-                name="PKG_CONFIG_PATH",
-                value=_prefix_path("lib", "pkgconfig"),
-                sep=os.pathsep,
-                env=env,
-            ),
-        )
-        try:
+        }
+        with _env_updated(env, overrides):
             yield
-        finally:
-            env.clear()
-            env.update(before)
 
 
 def _likely_binary(sdist: str, likely_binary_ignore: tuple[str, ...]) -> str | None:
+    ignore = frozenset(likely_binary_ignore)
+    ret = set()
+    setup_py_contents = b""
+
+    def _visit(name: str) -> bool:
+        # records binary extensions and returns whether `name` is a setup.py
+        # which still needs reading (`cffi_modules` is moot once ret is set)
+        # cheap suffix check first -- the vast majority of names won't match
+        if (
+            name.endswith(BINARY_EXTS_TUPLE)
+            and "/test/" not in name
+            and "/tests/" not in name
+            and name not in ignore
+        ):
+            _, ext = os.path.splitext(name)
+            if ext in BINARY_EXTS:
+                ret.add(ext)
+        return not ret and name.endswith("/setup.py")
+
+    # single pass over the members, tarballs are streamed rather than indexed
     if sdist.endswith(".zip"):
         with zipfile.ZipFile(sdist) as zipf:
-            names = zipf.namelist()
-
-            setup_py_contents = b""
-            for name in names:
-                if name.endswith("/setup.py"):
-                    with zipf.open(name) as f:
+            for info in zipf.infolist():
+                if _visit(info.filename):
+                    with zipf.open(info) as f:
                         setup_py_contents += f.read()
-
     else:
-        with tarfile.open(sdist) as tarf:
-            names = tarf.getnames()
-
-            setup_py_contents = b""
-            for name in names:
-                if name.endswith("/setup.py"):
-                    opt_f = tarf.extractfile(name)
+        with tarfile.open(sdist, "r|*") as tarf:
+            for member in tarf:
+                # links can't be extracted from a stream (`StreamError`)
+                if _visit(member.name) and member.isfile():
+                    opt_f = tarf.extractfile(member)
                     assert opt_f is not None
                     with opt_f as f:
                         setup_py_contents += f.read()
 
-    ret = set()
-    for name in names:
-        if "/test/" in name or "/tests/" in name:
-            continue
-
-        if name in likely_binary_ignore:
-            continue
-
-        _, ext = os.path.splitext(name)
-        if ext in BINARY_EXTS:
-            ret.add(ext)
-
     if ret:
         return f'sdist contains files with these extensions: {", ".join(sorted(ret))}'
     elif b"cffi_modules" in setup_py_contents:
@@ -545,34 +1081,41 @@ def _likely_binary(sdist: str, likely_binary_ignore: tuple[str, ...]) -> str | N
 
 def _produced_binary(wheel: str) -> bool:
     with zipfile.ZipFile(wheel) as zipf:
-        for name in zipf.namelist():
-            if name.endswith(".so"):
-                return True
-            # TODO: uwsgi
-        else:
-            return False
+        # `infolist()` is the already parsed central directory (no list copy)
+        # TODO: uwsgi
+        return any(info.filename.endswith(".so") for info in zipf.infolist())
 
 
-def _build(package: Package, python: Python, dest: str, index_url: str) -> str:
+def _build(
+    package: Package,
+    python: Python,
+    dest: str,
+    index_url: str,
+    *,
+    isolated: bool = True,
+    sdist: str | None = None,
+) -> str:
     with tempfile.TemporaryDirectory() as tmpdir:
         pip = (python.exe, "-mpip")
 
-        with plat.install(package), _prebuild(package, tmpdir):
+        # when not isolated the caller has already installed the requirements
+        install_packages = (package,) if isolated else ()
+        with plat.install(install_packages), _prebuild(package, tmpdir):
             # download the sdist first such that we can build against our index
-            sdist_dir = os.path.join(tmpdir, "sdist")
-            subprocess.check_call(
-                (
-                    *pip,
-                    "download",
-                    f"--dest={sdist_dir}",
-                    "--index-url=https://pypi.org/simple",
-                    "--no-deps",
-                    f"--no-binary={package.name}",
-                    f"{package.name}=={package.version}",
+            if sdist is None:
+                sdist_dir = os.path.join(tmpdir, "sdist")
+                subprocess.check_call(
+                    (
+                        *pip,
+                        "download",
+                        f"--dest={sdist_dir}",
+                        f"--index-url={PYPI_SIMPLE}",
+                        "--no-deps",
+                        f"--no-binary={package.name}",
+                        f"{package.name}=={package.version}",
+                    )
                 )
-            )
-            (sdist,) = os.listdir(sdist_dir)
-            sdist = os.path.join(sdist_dir, sdist)
+                sdist = _only_file(sdist_dir)
 
             build_dir = os.path.join(tmpdir, "build")
             subprocess.check_call(
@@ -584,14 +1127,11 @@ def _build(package: Package, python: Python, dest: str, index_url: str) -> str:
                     "--no-deps",
                     sdist,
                 ),
-                env={
-                    **os.environ,
-                    # disable bulky "universal2" building
-                    "ARCHFLAGS": "",
-                },
+                # disable bulky "universal2" building
+                env=_env_with(ARCHFLAGS=""),
             )
-            (filename,) = os.listdir(build_dir)
-            filename_full = os.path.join(build_dir, filename)
+            filename_full = _only_file(build_dir)
+            filename = os.path.basename(filename_full)
 
             likely_binary_reason = _likely_binary(sdist, package.likely_binary_ignore)
             if likely_binary_reason and not _produced_binary(filename_full):
@@ -606,9 +1146,9 @@ def _build(package: Package, python: Python, dest: str, index_url: str) -> str:
             else:
                 repair_dir = os.path.join(tmpdir, "repair")
                 plat.repair_wheel(filename_full, repair_dir)
-                (filename,) = os.listdir(repair_dir)
-                shutil.copy(os.path.join(repair_dir, filename), dest)
-                return filename
+                repaired = _only_file(repair_dir)
+                shutil.copy(repaired, dest)
+                return os.path.basename(repaired)
 
 
 def main() -> int:
@@ -616,44 +1156,169 @@ def main() -> int:
     parser.add_argument("--pypi-url", required=True)
     parser.add_argument("--packages-ini", default="packages.ini")
     parser.add_argument("--dest", default="dist")
+    parser.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="cache packages.ini, supported tags, and packages.json on disk",
+    )
+    parser.add_argument(
+        "--isolated",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help=(
+            "install / uninstall system requirements around each build.  "
+            "`--no-isolated` installs those of every package to be built once "
+            "for the whole run (requires `--jobs` > 1)"
+        ),
+    )
+    parser.add_argument(
+        "--reuse-container",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help=(
+            "linux: keep the build container running between invocations "
+            "and `exec` into it (requires a tty).  "
+            f"`docker rm --force {CONTAINER_NAME}` removes it"
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=8,
+        help="number of concurrent downloads, 1 downloads serially",
+    )
     args = parser.parse_args()
+    if not args.isolated and args.jobs <= 1:
+        # the packages to build are only known up front when downloading first
+        parser.error("--no-isolated requires --jobs > 1")
 
-    cfg = configparser.RawConfigParser()
-    if not cfg.read(args.packages_ini):
+    try:
+        all_packages = _load_packages(args.packages_ini, cache=args.cache)
+    except FileNotFoundError:
         raise SystemExit(f"does not exist: {args.packages_ini}")
 
     index_url = urllib.parse.urljoin(args.pypi_url, "simple")
 
     os.makedirs(args.dest, exist_ok=True)
 
-    plat.setup_deps(args.packages_ini, args.dest, args.pypi_url)
+    # the options affecting the build itself are passed on into the container
+    build_args = (
+        "--isolated" if args.isolated else "--no-isolated",
+        f"--jobs={args.jobs}",
+        "--cache" if args.cache else "--no-cache",
+    )
+    plat.setup_deps(
+        args.packages_ini,
+        args.dest,
+        args.pypi_url,
+        args.reuse_container,
+        build_args,
+    )
 
-    pythons = [Python(version, _supported_tags(version)) for version in PYTHONS]
+    names = frozenset(package.name for package in all_packages)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        # overlap fetching packages.json (releases the GIL) with computing tags
+        internal_wheels_future = executor.submit(
+            _internal_wheels, args.pypi_url, names, cache=args.cache
+        )
+        pythons = _pythons(cache=args.cache)
+        internal_wheels = internal_wheels_future.result()
+    built: dict[tuple[str, Version], frozenset[Tag]] = {}
+
+    # `SpecifierSet.__contains__` is comparatively slow and most packages share
+    # the same few `python_versions` -- evaluate each distinct one once
+    supported = {
+        (specifier_set, python.version): python.version_string in specifier_set
+        for specifier_set in {package.python_versions for package in all_packages}
+        for python in pythons
+    }
+    todo = [
+        (package, python)
+        for package, python in itertools.product(all_packages, pythons)
+        if supported[(package.python_versions, python.version)]
+        and not package.satisfied_by(internal_wheels, python.tags)
+    ]
+
+    downloads: dict[Package, dict[tuple[int, int], tuple[str | None, list[str]]]]
+    downloads = {}
+    if args.jobs > 1:
+        # downloads are network bound: do them all up front and concurrently.
+        # building stays serial as it modifies the system / environment
+        todo_pythons: dict[Package, list[Python]] = {}
+        for package, python in todo:
+            todo_pythons.setdefault(package, []).append(python)
+
+        with concurrent.futures.ThreadPoolExecutor(args.jobs) as executor:
+            futures = {
+                package: executor.submit(
+                    _download_pythons, package, package_pythons, args.dest
+                )
+                for package, package_pythons in todo_pythons.items()
+            }
+        downloads = {package: future.result() for package, future in futures.items()}
 
-    internal_wheels = _internal_wheels(args.pypi_url)
-    built: dict[str, list[tuple[Version, frozenset[Tag]]]] = {}
+    # packages with no downloadable wheel for at least one python
+    to_build = [
+        package
+        for package, package_downloads in downloads.items()
+        if any(fn is None for fn, _ in package_downloads.values())
+    ]
 
-    all_packages = [Package.make(k, cfg[k]) for k in cfg.sections()]
-    for package, python in itertools.product(all_packages, pythons):
-        if package.satisfied_by(internal_wheels, python.tags):
-            continue
-        elif python.version_string not in package.python_versions:
-            continue
+    with contextlib.ExitStack() as ctx:
+        sdists: dict[Package, concurrent.futures.Future[str | None]] = {}
+        if to_build:
+            # fetch the sdists of anything which will need building while
+            # the (serial) builds happen
+            sdists_dir = ctx.enter_context(tempfile.TemporaryDirectory())
+            executor = ctx.enter_context(
+                concurrent.futures.ThreadPoolExecutor(args.jobs)
+            )
+            for package in to_build:
+                package_dir = os.path.join(
+                    sdists_dir, f"{package.name}-{package.version}"
+                )
+                sdists[package] = executor.submit(_download_sdist, package, package_dir)
 
-        print(f"=== {package.name}=={package.version}@{python.version}")
+        requirements_installed = args.isolated
+        for package, python in todo:
+            print(f"=== {package.name}=={package.version}@{python.version}")
+
+            if package.satisfied_by(built, python.tags):
+                print("-> just built!")
+                continue
 
-        if package.satisfied_by(built, python.tags):
-            print("-> just built!")
-        else:
             print("-> building...")
-            downloaded_wheel = _download(package, python, args.dest)
+            if package in downloads:
+                downloaded_wheel, output = downloads[package][python.version]
+                for line in output:
+                    print(line)
+            else:
+                downloaded_wheel = _download(package, python, args.dest)
             if downloaded_wheel is not None:
                 _add_wheel(built, downloaded_wheel)
                 print(f"-> downloaded! {downloaded_wheel}")
-            else:
-                built_wheel = _build(package, python, args.dest, index_url)
-                _add_wheel(built, built_wheel)
-                print(f"-> built! {built_wheel}")
+                continue
+
+            if not requirements_installed:
+                # opt-in: install the union of the requirements of everything
+                # to be built once rather than installing / purging the shared
+                # ones for every package.  this gives up catching a package's
+                # missing `apt_requires` / `brew_requires`
+                ctx.enter_context(plat.install(to_build))
+                requirements_installed = True
+
+            sdist = sdists[package].result() if package in sdists else None
+            built_wheel = _build(
+                package,
+                python,
+                args.dest,
+                index_url,
+                isolated=args.isolated,
+                sdist=sdist,
+            )
+            _add_wheel(built, built_wheel)
+            print(f"-> built! {built_wheel}")
 
     return 0
 
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os.path
+import tempfile
+import urllib.error
+import urllib.request
+from typing import Any
+
+
+def cache_dir() -> str:
+    return os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+        "pypi-build",
+    )
+
+
+def write_atomic(path: str, contents: bytes) -> None:
+    dirname = os.path.dirname(path)
+    os.makedirs(dirname, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=dirname, delete=False) as f:
+        f.write(contents)
+    os.replace(f.name, path)
+
+
+def fetch(url: str, *, cache: bool = False) -> bytes:
+    if not cache:
+        with urllib.request.urlopen(url) as resp:
+            return resp.read()
+
+    # stored as a json line of validators followed by the body
+    path = os.path.join(cache_dir(), "http", hashlib.sha256(url.encode()).hexdigest())
+    try:
+        with open(path, "rb") as f:
+            meta = json.loads(f.readline())
+            body = f.read()
+    except (OSError, ValueError):
+        meta, body = {}, b""
+
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    req = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(req) as resp:
+            body = resp.read()
+            meta = {
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+            }
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and headers:
+            return body
+        else:
+            raise
+
+    write_atomic(path, json.dumps(meta).encode() + b"\n" + body)
+    return body
+
+
+def json_lines(contents: bytes) -> list[Any]:
+    # parsed as a single array (one `json.loads` rather than one per line)
+    lines = contents.splitlines()
+    return json.loads(b"[%s]" % b",".join(line for line in lines if line))
@@ -1,24 +1,29 @@
 from __future__ import annotations
 
 import argparse
-import configparser
-import io
+import functools
 import re
 import sys
+from collections.abc import Generator
 from collections.abc import Sequence
 
 from packaging.utils import canonicalize_name
 from packaging.version import Version
 
+import ini
+
 _NO_FORMAT = {"custom_prebuild"}
 
 _PKG_RE = re.compile("^.*==.*$")
-_TRAILING_WS = re.compile(" +\n")
+
+
+# most packages have several versions listed
+_canonicalize_name = functools.cache(canonicalize_name)
 
 
 def _section_sort_key(s: str) -> tuple[str, Version]:
     pkg_s, version = s.split("==", 1)
-    return canonicalize_name(pkg_s), Version(version)
+    return _canonicalize_name(pkg_s), Version(version)
 
 
 def _format_value(v: str) -> str:
@@ -31,16 +36,30 @@ def _format_value(v: str) -> str:
         return v
 
 
+def _format_lines(k: str, v: str) -> Generator[str, None, None]:
+    # what `RawConfigParser.write` produces, but with continuation lines
+    # indented by 4 spaces (rather than tabs) and no trailing whitespace
+    indent = ""
+    for line in f"{k} = {v}".split("\n"):
+        line = f"{indent}{line}".replace("\t", "    ").rstrip(" ")
+        yield f"{line}\n"
+        indent = "    "
+
+
 def _format_file(filename: str) -> int:
     with open(filename, encoding="UTF-8", newline="") as f:
         contents = f.read()
 
-    orig = configparser.RawConfigParser(strict=False)
-    orig.read_string(contents)
+    try:
+        orig = ini.parse_string(contents, filename=filename, strict=False)
+    except ValueError as e:
+        # the message is already prefixed with `{filename}:{lineno}:`
+        print(e, file=sys.stderr)
+        return 1
 
     errors = []
     # validate that each of the sections are named properly
-    for section in orig.sections():
+    for section in orig:
         if not _PKG_RE.fullmatch(section):
             errors.append(f"section [{section}] must be `[{section}==...]`")
 
@@ -49,40 +68,29 @@ def _format_file(filename: str) -> int:
             print(f"{filename}: {error}", file=sys.stderr)
         return 1
 
-    cfg = configparser.RawConfigParser()
-    for section in sorted(orig.sections(), key=_section_sort_key):
-        pkg_s, version = _section_sort_key(section)
+    prev_pkg = None
+    seen = set()
+    lines: list[str] = []
+    # parse each section name once (`Version` is comparatively expensive)
+    keyed = [(_section_sort_key(section), section) for section in orig]
+    keyed.sort(key=lambda kv: kv[0])
+    for (pkg_s, version), section in keyed:
         newsection = f"{pkg_s}=={version}"
-        cfg.add_section(newsection)
+        if newsection in seen:
+            print(f"{filename}: duplicate section [{newsection}]", file=sys.stderr)
+            return 1
+        seen.add(newsection)
+
+        # sections of the same package are grouped without blank lines
+        if prev_pkg is not None and pkg_s != prev_pkg:
+            lines.append("\n")
+        prev_pkg = pkg_s
+        lines.append(f"[{newsection}]\n")
 
         for k, v in sorted(orig[section].items()):
             if k not in _NO_FORMAT:
-                cfg[newsection][k] = _format_value(v)
-            else:
-                cfg[newsection][k] = v
-
-    cfg_sio = io.StringIO()
-    cfg.write(cfg_sio)
-    cfg_sio.seek(0)
-
-    prev_pkg = ""
-    lines: list[str] = []
-    for line in cfg_sio:
-        line = line.replace("\t", " " * 4)
-        line = _TRAILING_WS.sub("\n", line)
-
-        if line.startswith("[") and line.endswith("]\n"):
-            pkg, _ = line.lstrip("[").split("==", 1)
-            # if the previous package was the same, remove the blank lines between
-            if pkg == prev_pkg:
-                while lines and not lines[-1].strip():
-                    lines.pop()
-            prev_pkg = pkg
-        lines.append(line)
-
-    # remove extra blank line that configparser adds
-    while lines and not lines[-1].strip():
-        lines.pop()
+                v = _format_value(v)
+            lines.extend(_format_lines(k, v))
 
     newcontents = "".join(lines)
     if contents != newcontents:
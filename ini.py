@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import re
+
+_SECTION_RE = re.compile(r"\[([^\]]+)\]")
+_KV_RE = re.compile(r"([^=\s]+)\s*=\s*(.*)")
+
+
+def parse(filename: str) -> dict[str, dict[str, str]]:
+    with open(filename, "rb") as f:
+        contents = f.read().decode()
+    return parse_string(contents, filename=filename)
+
+
+def parse_string(
+    contents: str,
+    *,
+    filename: str = "<string>",
+    strict: bool = True,
+) -> dict[str, dict[str, str]]:
+    # a (much faster) subset of `RawConfigParser` -- just what packages.ini uses
+    # `strict=False` merges duplicate sections rather than erroring
+    ret: dict[str, dict[str, str]] = {}
+    section: dict[str, str] | None = None
+    key = None
+    blank_lines = 0
+    for lineno, line in enumerate(contents.splitlines(), start=1):
+        c = line[:1]
+        if c in ("", "#", ";"):
+            blank_lines += c == ""
+            continue
+        elif c in (" ", "\t"):
+            stripped = line.strip()
+            if not stripped:
+                blank_lines += 1
+                continue
+            elif stripped[0] in "#;":
+                continue
+            elif section is None or key is None:
+                raise ValueError(f"{filename}:{lineno}: unexpected continuation")
+            else:
+                # blank lines within a value are kept (but not trailing ones)
+                sep = "\n" * (blank_lines + 1)
+                section[key] = f"{section[key]}{sep}{stripped}"
+        elif c == "[":
+            section_match = _SECTION_RE.fullmatch(line.rstrip())
+            if section_match is None:
+                raise ValueError(f"{filename}:{lineno}: invalid section: {line!r}")
+            name = section_match[1]
+            if name not in ret:
+                section = ret[name] = {}
+            elif strict:
+                raise ValueError(f"{filename}:{lineno}: duplicate section [{name}]")
+            else:
+                section = ret[name]
+            key = None
+        else:
+            kv_match = _KV_RE.fullmatch(line)
+            if kv_match is None:
+                raise ValueError(f"{filename}:{lineno}: invalid line: {line!r}")
+            elif section is None:
+                raise ValueError(f"{filename}:{lineno}: key outside of section")
+            key = kv_match[1].lower()
+            section[key] = kv_match[2].strip()
+        blank_lines = 0
+
+    return ret
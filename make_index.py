@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import argparse
-import email
+import concurrent.futures
 import functools
 import hashlib
 import itertools
@@ -12,10 +12,13 @@ import subprocess
 import sys
 import tempfile
 import urllib.parse
-import urllib.request
 import zipfile
+from collections.abc import Generator
 from collections.abc import Sequence
 from typing import Any
+from typing import IO
+
+import caching
 
 
 @functools.lru_cache(maxsize=1)
@@ -25,11 +28,33 @@ def _commit_info() -> tuple[str, int]:
     return h, int(t)
 
 
+def _headers(f: IO[bytes]) -> dict[str, list[str]]:
+    # only the headers of METADATA (as `email.message_from_binary_file` would
+    # parse them) -- stopping before the (potentially huge) description body
+    ret: dict[str, list[str]] = {}
+    values: list[str] | None = None
+    for line_b in f:
+        line = line_b.decode("UTF-8", "replace").rstrip("\r\n")
+        if not line:
+            break
+        elif line[0] in " \t":
+            if values:
+                values[-1] = f"{values[-1]}\n{line}"
+        else:
+            k, sep, v = line.partition(":")
+            if sep:
+                values = ret.setdefault(k.lower(), [])
+                values.append(v.lstrip(" \t"))
+            else:
+                values = None
+    return ret
+
+
 def _make_info(filename: str) -> dict[str, Any]:
     h, t = _commit_info()
 
     with open(filename, "rb") as f:
-        sha256 = hashlib.sha256(f.read()).hexdigest()
+        sha256 = hashlib.file_digest(f, "sha256").hexdigest()
 
     with zipfile.ZipFile(filename) as zipf:
         (metadata,) = (
@@ -38,11 +63,11 @@ def _make_info(filename: str) -> dict[str, Any]:
             if name.endswith(".dist-info/METADATA") and name.count("/") == 1
         )
         with zipf.open(metadata) as f:
-            info = email.message_from_binary_file(f)
+            headers = _headers(f)
 
     dist_info = {
-        "requires_dist": info.get_all("requires-dist"),
-        "requires_python": info.get("requires-python"),
+        "requires_dist": headers.get("requires-dist"),
+        "requires_python": headers.get("requires-python", (None,))[0],
     }
 
     return {
@@ -54,15 +79,46 @@ def _make_info(filename: str) -> dict[str, Any]:
     }
 
 
+def _sort_key(entry: os.DirEntry[str]) -> str:
+    # directories sort as their full path would (`dist-linux/` after
+    # `dist-linux-arm64/` since `-` < `/`)
+    return f"{entry.name}/" if entry.is_dir(follow_symlinks=False) else entry.name
+
+
+def _files(dirname: str) -> Generator[tuple[str, str], None, None]:
+    try:
+        entries = list(os.scandir(dirname))
+    except FileNotFoundError:
+        # e.g. no build uploaded any artifacts
+        return
+
+    # scandir is unordered, so we'll sort (each directory) for repeatability
+    for entry in sorted(entries, key=_sort_key):
+        if entry.is_dir(follow_symlinks=False):
+            yield from _files(entry.path)
+        elif entry.is_dir():
+            # like `os.walk`: symlinked directories are not descended into
+            continue
+        else:
+            yield entry.name, entry.path
+
+
 def main(argv: Sequence[str] | None = None) -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--dist", default="dist")
     parser.add_argument("--pypi-url", required=True)
     parser.add_argument("--dest", required=True)
+    parser.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="revalidate a cached packages.json rather than downloading it",
+    )
     args = parser.parse_args(argv)
 
     url = urllib.parse.urljoin(args.pypi_url, "packages.json")
-    packages = [json.loads(line) for line in urllib.request.urlopen(url)]
+    contents = caching.fetch(url, cache=args.cache)
+    packages = caching.json_lines(contents)
     on_pypi = {package["filename"] for package in packages}
 
     shutil.rmtree(args.dest, ignore_errors=True)
@@ -71,26 +127,36 @@ def main(argv: Sequence[str] | None = None) -> int:
     wheels_dir = os.path.join(args.dest, "wheels")
     os.makedirs(wheels_dir)
 
-    new_packages = []
+    new_filenames = []
     # we may build purepy on different platforms / architectures
     # let the first one win
     seen = set()
 
-    # walk is unordered, so we'll sort to ensure repeatability
-    for filename in sorted(
-        os.path.join(root, filename)
-        for root, _, filenames in os.walk(args.dist)
-        for filename in filenames
-    ):
-        basename = os.path.basename(filename)
+    for basename, filename in _files(args.dist):
         if basename in on_pypi:
             raise AssertionError(f"{basename}: already on pypi?")
         elif basename in seen:
             continue
 
         seen.add(basename)
-        new_packages.append(_make_info(filename))
-        shutil.copy(filename, wheels_dir)
+        new_filenames.append(filename)
+
+    def _process(filename: str) -> dict[str, Any]:
+        info = _make_info(filename)
+        # `dist` and `dest` are usually on the same filesystem: link, not copy
+        try:
+            os.link(filename, os.path.join(wheels_dir, info["filename"]))
+        except OSError:
+            shutil.copy(filename, wheels_dir)
+        return info
+
+    # populate the cache up front rather than racing on it in the workers
+    _commit_info()
+
+    # hashing / copying is I/O bound, `map` keeps the (sorted) order
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        new_packages = list(executor.map(_process, new_filenames))
 
     with tempfile.TemporaryDirectory() as tmpdir:
         prev_json = os.path.join(tmpdir, "previous.json")
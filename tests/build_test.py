@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import email.message
 import io
 import os
 import shutil
 import subprocess
+import sys
 import tarfile
+import tempfile
 import urllib.error
 import urllib.request
 import zipfile
@@ -26,10 +29,12 @@ from build import Package
         ("a-1.data/scripts/run_thing.py", False),
         ("a-1.data/purelib/unrelated", False),
         ("scripts/unrelated", False),
+        ("a-1.data/scripts/", False),
+        ("a/b-1.data/scripts/uwsgi", False),
     ),
 )
-def test_data_scripts_re(s, matched):
-    assert bool(build.DATA_SCRIPTS.fullmatch(s)) is matched
+def test_is_data_script(s, matched):
+    assert build._is_data_script(s) is matched
 
 
 @pytest.mark.parametrize("ext", sorted(build.BINARY_EXTS))
@@ -50,6 +55,12 @@ def test_supported_tags_includes_purelib_tags():
     assert Tag("py38", "none", "any") in tags
 
 
+def test_supported_tags_cached():
+    tags = build._supported_tags((3, 9))
+    assert isinstance(tags, frozenset)
+    assert build._supported_tags((3, 9)) is tags
+
+
 def test_package_default():
     ret = Package.make("a==1", {})
     assert ret == Package(
@@ -89,6 +100,76 @@ def test_package_parses_split_values():
     )
 
 
+def test_load_packages(tmp_path):
+    packages_ini = tmp_path.joinpath("packages.ini")
+    packages_ini.write_text("[a==1]\napt_requires = libxml2-dev\n")
+
+    ret = build._load_packages(str(packages_ini))
+    assert ret == [Package.make("a==1", {"apt_requires": "libxml2-dev"})]
+
+
+def test_load_packages_cached(tmp_path):
+    packages_ini = tmp_path.joinpath("packages.ini")
+    packages_ini.write_text("[a==1]\n")
+
+    with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": str(tmp_path)}):
+        first = build._load_packages(str(packages_ini), cache=True)
+        # a cache hit should not parse the file again
+        with mock.patch.object(build.ini, "parse", side_effect=AssertionError):
+            second = build._load_packages(str(packages_ini), cache=True)
+
+    assert first == second == [Package.make("a==1", {})]
+
+
+def test_load_packages_cache_invalidated_on_change(tmp_path):
+    packages_ini = tmp_path.joinpath("packages.ini")
+    packages_ini.write_text("[a==1]\n")
+
+    with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": str(tmp_path)}):
+        build._load_packages(str(packages_ini), cache=True)
+        packages_ini.write_text("[a==1]\n[b==2]\n")
+        ret = build._load_packages(str(packages_ini), cache=True)
+
+    assert ret == [Package.make("a==1", {}), Package.make("b==2", {})]
+
+
+def test_load_packages_cache_unloadable_is_a_miss(tmp_path):
+    packages_ini = tmp_path.joinpath("packages.ini")
+    packages_ini.write_text("[a==1]\n")
+
+    with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": str(tmp_path)}):
+        cache_dir = build.caching.cache_dir()
+        os.makedirs(cache_dir)
+        # e.g. pickled against a `packaging` which has since moved a class
+        with open(os.path.join(cache_dir, "packages.pkl"), "wb") as f:
+            f.write(b"cnot_a_module\nnot_a_class\n.")
+
+        ret = build._load_packages(str(packages_ini), cache=True)
+
+    assert ret == [Package.make("a==1", {})]
+
+
+def test_pythons_cached(tmp_path):
+    with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": str(tmp_path)}):
+        first = build._pythons(cache=True)
+        with mock.patch.object(build, "_supported_tags", side_effect=AssertionError):
+            second = build._pythons(cache=True)
+
+    assert first == second == build._pythons()
+
+
+def test_pythons_cache_invalidated_on_other_interpreter(tmp_path):
+    with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": str(tmp_path)}):
+        build._pythons(cache=True)
+        impl = mock.Mock(cache_tag="cpython-299")
+        with mock.patch.object(sys, "implementation", impl):
+            with mock.patch.object(build, "_supported_tags") as supported_tags:
+                supported_tags.return_value = frozenset()
+                build._pythons(cache=True)
+
+    assert supported_tags.called
+
+
 LINUX_3_8_SUPPORTED_TAGS = frozenset(
     (
         Tag("py3", "none", "any"),
@@ -96,6 +177,7 @@ LINUX_3_8_SUPPORTED_TAGS = frozenset(
         Tag("cp38", "cp38", "manylinux1_x86_64"),
     )
 )
+MY_PKG = Package.make("my-pkg==1.2.3", {})
 
 
 @pytest.mark.parametrize(
@@ -107,10 +189,9 @@ LINUX_3_8_SUPPORTED_TAGS = frozenset(
     ),
 )
 def test_package_satisfied_by_matches(filename):
-    package = Package.make("my-pkg==1.2.3", {})
-    wheels: dict[str, list[tuple[Version, frozenset[Tag]]]] = {}
+    wheels: dict[tuple[str, Version], frozenset[Tag]] = {}
     build._add_wheel(wheels, filename)
-    assert package.satisfied_by(wheels, LINUX_3_8_SUPPORTED_TAGS) is True
+    assert MY_PKG.satisfied_by(wheels, LINUX_3_8_SUPPORTED_TAGS) is True
 
 
 @pytest.mark.parametrize(
@@ -124,10 +205,35 @@ def test_package_satisfied_by_matches(filename):
     ),
 )
 def test_package_satisfied_by_does_not_match(filename):
-    package = Package.make("my-pkg==1.2.3", {})
-    wheels: dict[str, list[tuple[Version, frozenset[Tag]]]] = {}
+    wheels: dict[tuple[str, Version], frozenset[Tag]] = {}
     build._add_wheel(wheels, filename)
-    assert package.satisfied_by(wheels, LINUX_3_8_SUPPORTED_TAGS) is False
+    assert MY_PKG.satisfied_by(wheels, LINUX_3_8_SUPPORTED_TAGS) is False
+
+
+def test_add_wheel_merges_tags():
+    wheels: dict[tuple[str, Version], frozenset[Tag]] = {}
+    build._add_wheel(wheels, "a-1-cp311-cp311-manylinux1_x86_64.whl")
+    build._add_wheel(wheels, "a-1-cp312-cp312-manylinux1_x86_64.whl")
+    assert wheels == {
+        ("a", Version("1")): frozenset(
+            (
+                Tag("cp311", "cp311", "manylinux1_x86_64"),
+                Tag("cp312", "cp312", "manylinux1_x86_64"),
+            )
+        ),
+    }
+
+
+def test_package_satisfied_by_index_updated_incrementally():
+    package = Package.make("a==1", {})
+    cp312_tags = frozenset((Tag("cp312", "cp312", "manylinux1_x86_64"),))
+    wheels: dict[tuple[str, Version], frozenset[Tag]] = {}
+
+    build._add_wheel(wheels, "a-1-cp311-cp311-manylinux1_x86_64.whl")
+    assert package.satisfied_by(wheels, cp312_tags) is False
+
+    build._add_wheel(wheels, "a-1-cp312-cp312-manylinux1_x86_64.whl")
+    assert package.satisfied_by(wheels, cp312_tags) is True
 
 
 def test_get_internal_wheels():
@@ -141,30 +247,191 @@ def test_get_internal_wheels():
         ret = build._internal_wheels("https://example.com")
 
     assert ret == {
-        "detect-test-pollution": [
-            (Version("1.0.0"), frozenset((Tag("py3", "none", "any"),))),
-            (Version("1.1.0"), frozenset((Tag("py3", "none", "any"),))),
-            (Version("1.1.1"), frozenset((Tag("py3", "none", "any"),))),
-        ],
+        ("detect-test-pollution", Version("1.0.0")): frozenset(
+            (Tag("py3", "none", "any"),)
+        ),
+        ("detect-test-pollution", Version("1.1.0")): frozenset(
+            (Tag("py3", "none", "any"),)
+        ),
+        ("detect-test-pollution", Version("1.1.1")): frozenset(
+            (Tag("py3", "none", "any"),)
+        ),
     }
 
 
+def test_get_internal_wheels_blank_lines():
+    contents = b"""\
+{"filename": "detect_test_pollution-1.1.1-py3-none-any.whl"}
+
+"""
+    bio = io.BytesIO(contents)
+    with mock.patch.object(urllib.request, "urlopen", return_value=bio):
+        ret = build._internal_wheels("https://example.com")
+
+    assert ret == {
+        ("detect-test-pollution", Version("1.1.1")): frozenset(
+            (Tag("py3", "none", "any"),)
+        ),
+    }
+
+
+def test_get_internal_wheels_cached(tmp_path):
+    contents = b'{"filename": "a-1-py3-none-any.whl"}\n'
+    with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": str(tmp_path)}):
+        with mock.patch.object(build.caching, "fetch", return_value=contents):
+            first = build._internal_wheels("https://example.com", cache=True)
+            # same contents (say a 304): the filenames are not parsed again
+            with mock.patch.object(build, "_add_wheel", side_effect=AssertionError):
+                second = build._internal_wheels("https://example.com", cache=True)
+
+    assert (
+        first
+        == second
+        == {("a", Version("1")): frozenset((Tag("py3", "none", "any"),))}
+    )
+
+
+def test_get_internal_wheels_only_requested_names():
+    contents = b"""\
+{"filename": "detect_test_pollution-1.1.1-py3-none-any.whl"}
+{"filename": "other-1.0.0-py3-none-any.whl"}
+"""
+    bio = io.BytesIO(contents)
+    with mock.patch.object(urllib.request, "urlopen", return_value=bio):
+        names = frozenset(("detect-test-pollution",))
+        ret = build._internal_wheels("https://example.com", names)
+
+    assert ret == {
+        ("detect-test-pollution", Version("1.1.1")): frozenset(
+            (Tag("py3", "none", "any"),)
+        ),
+    }
+
+
+def test_darwin_installed_packages_from_cellar(tmp_path):
+    tmp_path.joinpath("openssl@3").mkdir()
+    tmp_path.joinpath("xz").mkdir()
+
+    with mock.patch.dict(os.environ, {"HOMEBREW_CELLAR": str(tmp_path)}):
+        with mock.patch.object(subprocess, "check_output", side_effect=AssertionError):
+            ret = build._darwin_installed_packages()
+
+    assert ret == frozenset(("openssl@3", "xz"))
+
+
+def test_linux_installed_packages_from_dpkg_info(tmp_path):
+    tmp_path.joinpath("libc6:amd64.list").touch()
+    tmp_path.joinpath("libc6:amd64.md5sums").touch()
+    tmp_path.joinpath("pkg-config.list").touch()
+
+    with mock.patch.object(build, "DPKG_INFO", str(tmp_path)):
+        with mock.patch.object(subprocess, "check_output", side_effect=AssertionError):
+            ret = build._linux_installed_packages()
+
+    assert ret == frozenset(("libc6:amd64", "pkg-config"))
+
+
+def test_apt_install_already_installed_skips_apt(tmp_path):
+    tmp_path.joinpath("libxml2-dev:amd64.list").touch()
+    tmp_path.joinpath("pkg-config.list").touch()
+
+    with mock.patch.object(build, "DPKG_INFO", str(tmp_path)):
+        with mock.patch.object(subprocess, "check_call") as check_call:
+            with build._apt_install(("libxml2-dev", "pkg-config")):
+                pass
+
+    check_call.assert_not_called()
+
+
+@pytest.mark.parametrize("spec", ("libxml2-dev=2.9.14", "libxml2-dev:i386"))
+def test_apt_install_qualified_requirement_left_to_apt(tmp_path, spec):
+    tmp_path.joinpath("libxml2-dev:amd64.list").touch()
+
+    with mock.patch.object(build, "DPKG_INFO", str(tmp_path)):
+        with mock.patch.object(build, "_apt_update"):
+            with mock.patch.object(subprocess, "check_call") as check_call:
+                with build._apt_install((spec,)):
+                    pass
+
+    (install_cmd,), _ = check_call.call_args
+    assert install_cmd[:2] == ("apt-get", "install")
+    assert install_cmd[-1] == spec
+
+
+def test_linux_install_merges_requirements():
+    packages = (
+        Package.make("a==1", {"apt_requires": "libxml2-dev\npkg-config"}),
+        Package.make("b==2", {}),
+        Package.make("c==3", {"apt_requires": "pkg-config\nlibxslt1-dev"}),
+    )
+
+    with mock.patch.object(build, "_apt_install") as apt_install:
+        with build._linux_install(packages):
+            pass
+
+    apt_install.assert_called_once_with(("libxml2-dev", "pkg-config", "libxslt1-dev"))
+
+
+def test_linux_install_nothing_required():
+    with mock.patch.object(build, "_apt_install") as apt_install:
+        with build._linux_install(()):
+            pass
+
+    apt_install.assert_not_called()
+
+
 def test_brew_paths():
     out = b"""\
 /opt/homebrew/opt/openssl@1.1
 /opt/homebrew/opt/xz
 """
-    with mock.patch.object(subprocess, "check_output", return_value=out):
+    build._brew_paths.cache_clear()
+    with mock.patch.object(subprocess, "check_output", return_value=out) as mck:
         ret = build._brew_paths("openssl@1.1", "xz")
-    assert ret == ["/opt/homebrew/opt/openssl@1.1", "/opt/homebrew/opt/xz"]
+        assert build._brew_paths("openssl@1.1", "xz") is ret
+    assert ret == ("/opt/homebrew/opt/openssl@1.1", "/opt/homebrew/opt/xz")
+    mck.assert_called_once()
+
+
+def test_apt_update_runs_without_lists(tmp_path):
+    build._apt_update.cache_clear()
+    with mock.patch.object(build, "APT_LISTS", str(tmp_path)):
+        with mock.patch.object(subprocess, "check_call") as check_call_mck:
+            build._apt_update()
+
+    check_call_mck.assert_called_once_with(("apt-get", "update", "-qq"))
+
+
+def test_apt_update_skipped_with_recent_lists(tmp_path):
+    tmp_path.joinpath("deb.debian.org_debian_dists_bookworm_main_Packages").touch()
+    build._apt_update.cache_clear()
+    with mock.patch.object(build, "APT_LISTS", str(tmp_path)):
+        with mock.patch.object(subprocess, "check_call") as check_call_mck:
+            build._apt_update()
+
+    check_call_mck.assert_not_called()
+
+
+def test_apt_update_runs_with_stale_lists(tmp_path):
+    tmp_path.joinpath("deb.debian.org_debian_dists_bookworm_main_Packages").touch()
+    later = build.time.time() + build.APT_UPDATE_TTL + 1
+    build._apt_update.cache_clear()
+    with mock.patch.object(build, "APT_LISTS", str(tmp_path)):
+        with mock.patch.object(build.time, "time", return_value=later):
+            with mock.patch.object(subprocess, "check_call") as check_call_mck:
+                build._apt_update()
+
+    check_call_mck.assert_called_once_with(("apt-get", "update", "-qq"))
 
 
 def test_docker_run_podman():
+    build._docker_run.cache_clear()
     with mock.patch.object(shutil, "which", return_value="/usr/bin/podman"):
         assert build._docker_run() == ("podman", "run")
 
 
 def test_docker_run_docker():
+    build._docker_run.cache_clear()
     with mock.patch.object(shutil, "which", return_value=None):
         with mock.patch.object(os, "getuid", return_value=1000):
             with mock.patch.object(os, "getgid", return_value=1000):
@@ -172,6 +439,132 @@ def test_docker_run_docker():
     assert ret == ("docker", "run", "--user", "1000:1000")
 
 
+@pytest.fixture
+def _podman(tmp_path):
+    build._docker_run.cache_clear()
+    env = {"XDG_CACHE_HOME": str(tmp_path)}
+    with mock.patch.dict(os.environ, env, clear=True):
+        with mock.patch.object(shutil, "which", return_value="/usr/bin/podman"):
+            yield
+    build._docker_run.cache_clear()
+
+
+def _main_build_args(tmp_path, *args):
+    packages_ini = tmp_path.joinpath("packages.ini")
+    packages_ini.write_text("[a==1]\n")
+    argv = [
+        "build.py",
+        "--pypi-url=https://e.com",
+        f"--packages-ini={packages_ini}",
+        f"--dest={tmp_path.joinpath('dist')}",
+        *args,
+    ]
+    # stop as soon as the build would re-run itself in the container
+    setup_deps = mock.Mock(side_effect=SystemExit(0))
+    with mock.patch.object(sys, "argv", argv):
+        with mock.patch.object(
+            build, "plat", build.plat._replace(setup_deps=setup_deps)
+        ):
+            with pytest.raises(SystemExit):
+                build.main()
+    (*_, build_args), _ = setup_deps.call_args
+    return build_args
+
+
+def test_main_forwards_build_args(tmp_path):
+    build_args = _main_build_args(tmp_path, "--no-isolated", "--jobs=4", "--cache")
+    assert build_args == ("--no-isolated", "--jobs=4", "--cache")
+
+
+def test_main_forwards_build_args_defaults(tmp_path):
+    assert _main_build_args(tmp_path) == ("--isolated", "--jobs=8", "--no-cache")
+
+
+@pytest.mark.usefixtures("_podman")
+def test_linux_setup_deps_runs_fresh_container(tmp_path):
+    packages_ini = str(tmp_path.joinpath("packages.ini"))
+    with mock.patch.object(subprocess, "check_call") as check_call:
+        with mock.patch.object(os, "execvp") as execvp:
+            build._linux_setup_deps(
+                packages_ini, "dist", "https://e.com", False, ("--no-isolated",)
+            )
+
+    check_call.assert_not_called()
+    (_, cmd), _ = execvp.call_args
+    assert cmd[:4] == ("podman", "run", "--pull=always", "--rm")
+    assert f"--volume={packages_ini}:/packages.ini:ro" in cmd
+    assert cmd[-1] == "--no-isolated"
+    # the host's cache outlives the container
+    cache_dir = tmp_path.joinpath("pypi-build")
+    assert cache_dir.is_dir()
+    assert f"--volume={cache_dir}:/cache/pypi-build:rw" in cmd
+    assert "--env=XDG_CACHE_HOME=/cache" in cmd
+
+
+def _reuse_container(packages_ini, inspect_out):
+    inspect = subprocess.CompletedProcess((), 0, stdout=inspect_out)
+    with mock.patch.object(sys.stdin, "isatty", return_value=True):
+        with mock.patch.object(subprocess, "check_output", return_value=b"sha\n"):
+            with mock.patch.object(subprocess, "run", return_value=inspect) as run:
+                with mock.patch.object(subprocess, "check_call") as check_call:
+                    with mock.patch.object(os, "execvp") as execvp:
+                        build._linux_setup_deps(
+                            packages_ini,
+                            "dist",
+                            "https://e.com",
+                            True,
+                            ("--no-isolated",),
+                        )
+    return run, check_call, execvp
+
+
+@pytest.mark.usefixtures("_podman")
+def test_linux_setup_deps_reuse_container_starts_container(tmp_path):
+    packages_ini = str(tmp_path.joinpath("packages.ini"))
+    run, check_call, execvp = _reuse_container(packages_ini, b"")
+
+    (pull_cmd,), _ = check_call.call_args_list[0]
+    assert pull_cmd == ("podman", "pull", "--quiet", build.IMAGE_NAME)
+    # the stale / missing container is replaced
+    (rm_cmd,), _ = run.call_args_list[1]
+    assert rm_cmd == ("podman", "rm", "--force", "pypi-build")
+    (run_cmd,), _ = check_call.call_args_list[1]
+    assert run_cmd[:4] == ("podman", "run", "--rm", "--detach")
+    assert run_cmd[-3:] == ("sha", "sleep", "infinity")
+    (_, exec_cmd), _ = execvp.call_args
+    assert exec_cmd[:5] == ("podman", "exec", "--interactive", "--tty", "pypi-build")
+    assert "--packages-ini=/packages/packages.ini" in exec_cmd
+    assert exec_cmd[-1] == "--no-isolated"
+
+
+@pytest.mark.usefixtures("_podman")
+def test_linux_setup_deps_reuse_container_reuses_current(tmp_path):
+    packages_ini = str(tmp_path.joinpath("packages.ini"))
+    _, check_call, execvp = _reuse_container(packages_ini, b"")
+    (run_cmd,), _ = check_call.call_args_list[1]
+    (label,) = (arg for arg in run_cmd if arg.startswith("--label="))
+    key = label.partition("=")[2].partition("=")[2]
+
+    run, check_call, execvp = _reuse_container(packages_ini, f"true {key}\n".encode())
+
+    # only pulled, then exec'd into the running container
+    (pull_cmd,), _ = check_call.call_args
+    assert pull_cmd[:2] == ("podman", "pull")
+    run.assert_called_once()
+    (_, exec_cmd), _ = execvp.call_args
+    assert exec_cmd[:2] == ("podman", "exec")
+
+
+@pytest.mark.usefixtures("_podman")
+def test_linux_setup_deps_reuse_container_requires_tty(tmp_path):
+    packages_ini = str(tmp_path.joinpath("packages.ini"))
+    with mock.patch.object(sys.stdin, "isatty", return_value=False):
+        with pytest.raises(SystemExit) as excinfo:
+            build._linux_setup_deps(packages_ini, "dist", "https://e.com", True, ())
+    (msg,) = excinfo.value.args
+    assert msg == "--reuse-container requires a tty"
+
+
 @pytest.mark.parametrize(
     ("filename", "expected"),
     (
@@ -191,6 +584,22 @@ def test_expected_archs_for_wheel(filename, expected):
     assert build._expected_archs_for_wheel(filename) == expected
 
 
+def test_expected_archs_for_wheel_unexpected_platform():
+    with pytest.raises(AssertionError) as excinfo:
+        build._expected_archs_for_wheel("a-1-py3-none-manylinux2014_ppc64le.whl")
+    (msg,) = excinfo.value.args
+    assert msg == "unexpected plat='manylinux2014_ppc64le'"
+
+
+ELF_X86_64 = b"\x7fELF\x02\x01\x01" + b"\x00" * 11 + b"\x3e\x00"
+ELF_AARCH64 = b"\x7fELF\x02\x01\x01" + b"\x00" * 11 + b"\xb7\x00"
+MACHO_ARM64 = b"\xcf\xfa\xed\xfe\x0c\x00\x00\x01"
+MACHO_FAT = (
+    b"\xca\xfe\xba\xbe\x00\x00\x00\x02"
+    b"\x01\x00\x00\x07" + b"\x00" * 16 + b"\x01\x00\x00\x0c" + b"\x00" * 16
+)
+
+
 def test_get_archs_darwin_single_arch():
     out = b"""\
 ./simplejson/_speedups.cpython-38-darwin.so:
@@ -233,6 +642,79 @@ simplejson/_speedups.cpython-37m-aarch64-linux-gnu.so: ELF 64-bit LSB shared obj
         assert build._linux_get_archs("somefile.so") == {"aarch64"}
 
 
+def test_only_file(tmp_path):
+    tmp_path.joinpath("a-1-py3-none-any.whl").touch()
+    ret = build._only_file(str(tmp_path))
+    assert ret == str(tmp_path.joinpath("a-1-py3-none-any.whl"))
+
+
+def test_check_arch_purelib_wheel(tmp_path):
+    filename = tmp_path.joinpath("a-1-py3-none-any.whl")
+    with zipfile.ZipFile(filename, "w") as zipf:
+        zipf.open("a/__init__.py", "w").close()
+
+    with mock.patch.object(zipfile, "ZipFile", side_effect=AssertionError):
+        assert build._check_arch(str(filename)) is None
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    (
+        (ELF_X86_64, {"x86_64"}),
+        (ELF_AARCH64, {"aarch64"}),
+        (MACHO_ARM64, {"arm64"}),
+        (MACHO_FAT, {"x86_64", "arm64"}),
+        (b"\x7fELF\x02\x01\x01" + b"\x00" * 11 + b"\x03\x00", None),
+        (b"#!/bin/sh\n", None),
+        (b"", None),
+    ),
+)
+def test_archs_from_header(header, expected):
+    assert build._archs_from_header(header) == expected
+
+
+def test_check_arch_matching(tmp_path):
+    filename = tmp_path.joinpath("a-1-cp311-cp311-manylinux1_x86_64.whl")
+    with zipfile.ZipFile(filename, "w") as zipf:
+        zipf.writestr("a/_speedups.so", ELF_X86_64)
+        zipf.writestr("a-1.data/scripts/a", b"#!/usr/bin/python\n")
+
+    with mock.patch.object(tempfile, "TemporaryDirectory", side_effect=AssertionError):
+        assert build._check_arch(str(filename)) is None
+
+
+def test_check_arch_mismatched(tmp_path):
+    filename = tmp_path.joinpath("a-1-cp311-cp311-manylinux1_x86_64.whl")
+    with zipfile.ZipFile(filename, "w") as zipf:
+        zipf.writestr("a/_speedups.so", ELF_AARCH64)
+
+    assert build._check_arch(str(filename)) == (
+        "-> a/_speedups.so has mismatched architectures\n"
+        "---> expected x86_64\n"
+        "---> received aarch64\n"
+    )
+
+
+def test_check_arch_unknown_header_falls_back_to_platform(tmp_path):
+    i386 = b"\x7fELF\x01\x01\x01" + b"\x00" * 11 + b"\x03\x00"
+    filename = tmp_path.joinpath("a-1-cp311-cp311-manylinux1_x86_64.whl")
+    with zipfile.ZipFile(filename, "w") as zipf:
+        zipf.writestr("a/_speedups.so", i386)
+
+    def get_archs(file):
+        with open(file, "rb") as f:
+            assert f.read() == i386
+        return {"i386"}
+
+    plat = build.plat._replace(get_archs=get_archs)
+    with mock.patch.object(build, "plat", plat):
+        assert build._check_arch(str(filename)) == (
+            "-> a/_speedups.so has mismatched architectures\n"
+            "---> expected x86_64\n"
+            "---> received i386\n"
+        )
+
+
 def test_likely_binary_zip(tmp_path):
     filename = tmp_path.joinpath("a-1.zip")
     with zipfile.ZipFile(filename, "w") as zipf:
@@ -272,8 +754,8 @@ def test_likely_binary_cffi_zip(tmp_path):
 
 
 def test_likely_binary_cffi_tar(tmp_path):
-    filename = tmp_path.joinpath("a-1.tar.gz")
-    with tarfile.open(filename, "w:gz") as tarf:
+    filename = tmp_path.joinpath("a-1.tar")
+    with tarfile.open(filename, "w") as tarf:
         # similar to google-crc32c==1.1.2
         bio = io.BytesIO(
             b"from setuptols import setup\n"
@@ -290,9 +772,33 @@ def test_likely_binary_cffi_tar(tmp_path):
     assert reason == "sdist setup.py has `cffi_modules`"
 
 
-def test_likely_binary_ignores_test_files(tmp_path):
+@pytest.mark.parametrize("link_type", (tarfile.SYMTYPE, tarfile.LNKTYPE))
+def test_likely_binary_tar_linked_setup_py(tmp_path, link_type):
     filename = tmp_path.joinpath("a-1.tar.gz")
     with tarfile.open(filename, "w:gz") as tarf:
+        tarf.addfile(tarfile.TarInfo("a-1/pkg/setup.py"))
+        tar_info = tarfile.TarInfo("a-1/setup.py")
+        tar_info.type = link_type
+        tar_info.linkname = "pkg/setup.py"
+        tarf.addfile(tar_info)
+
+    assert build._likely_binary(str(filename), ()) is None
+
+
+def test_likely_binary_extensions_skip_reading_setup_py(tmp_path):
+    filename = tmp_path.joinpath("a-1.zip")
+    with zipfile.ZipFile(filename, "w") as zipf:
+        zipf.open("a-1/src/_ext.c", "w").close()
+        zipf.writestr("a-1/setup.py", b"setup(cffi_modules=[])\n")
+
+    with mock.patch.object(zipfile.ZipFile, "open", side_effect=AssertionError):
+        reason = build._likely_binary(str(filename), ())
+    assert reason == "sdist contains files with these extensions: .c"
+
+
+def test_likely_binary_ignores_test_files(tmp_path):
+    filename = tmp_path.joinpath("a-1.tar")
+    with tarfile.open(filename, "w") as tarf:
         tarf.addfile(tarfile.TarInfo("a-1/test/_ext.pyd"))
         tarf.addfile(tarfile.TarInfo("a-1/tests/_ext.c"))
 
@@ -300,15 +806,181 @@ def test_likely_binary_ignores_test_files(tmp_path):
     assert reason is None
 
 
+def test_likely_binary_ignores_dotfiles(tmp_path):
+    filename = tmp_path.joinpath("a-1.tar")
+    with tarfile.open(filename, "w") as tarf:
+        tarf.addfile(tarfile.TarInfo("a-1/.c"))
+
+    reason = build._likely_binary(str(filename), ())
+    assert reason is None
+
+
 def test_likely_binary_ignore(tmp_path):
-    filename = tmp_path.joinpath("a-1.tar.gz")
-    with tarfile.open(filename, "w:gz") as tarf:
+    filename = tmp_path.joinpath("a-1.tar")
+    with tarfile.open(filename, "w") as tarf:
         tarf.addfile(tarfile.TarInfo("a-1/foo/bar.c"))
 
     reason = build._likely_binary(str(filename), ("a-1/foo/bar.c",))
     assert reason is None
 
 
+def test_download_pythons_reuses_purelib_wheel(tmp_path):
+    pkg = Package.make("a==1", {})
+    pythons = [
+        build.Python((3, 11), build._supported_tags((3, 11))),
+        build.Python((3, 12), build._supported_tags((3, 12))),
+    ]
+    with mock.patch.object(
+        build, "_download", return_value="a-1-py3-none-any.whl"
+    ) as download_mck:
+        ret = build._download_pythons(pkg, pythons, str(tmp_path))
+
+    assert ret == {(3, 11): ("a-1-py3-none-any.whl", [])}
+    download_mck.assert_called_once_with(pkg, pythons[0], str(tmp_path), log=mock.ANY)
+
+
+@pytest.mark.parametrize(
+    ("names", "expected"),
+    (
+        (("a/__init__.py",), False),
+        (("a/__init__.py", "a/_speedups.cpython-311-x86_64-linux-gnu.so"), True),
+    ),
+)
+def test_produced_binary(tmp_path, names, expected):
+    filename = tmp_path.joinpath("a-1-cp311-cp311-linux_x86_64.whl")
+    with zipfile.ZipFile(filename, "w") as zipf:
+        for name in names:
+            zipf.open(name, "w").close()
+
+    assert build._produced_binary(str(filename)) is expected
+
+
+PYPI_FILES_JSON = b"""\
+{
+  "files": [
+    {"filename": "a-1.tar.gz", "url": "https://e.com/a-1.tar.gz", "hashes": {}},
+    {
+      "filename": "a-1-cp311-cp311-manylinux1_x86_64.whl",
+      "url": "https://e.com/a-1-cp311-cp311-manylinux1_x86_64.whl",
+      "hashes": {}
+    },
+    {
+      "filename": "a-1-py3-none-any.whl",
+      "url": "https://e.com/a-1-py3-none-any.whl",
+      "hashes": {
+        "sha256": "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824"
+      }
+    }
+  ]
+}
+"""
+
+
+def test_pip_download_skipped_without_matching_wheel(tmp_path):
+    build._fetch_pypi_files.cache_clear()
+    pkg = Package.make("a==2", {})
+    python = build.Python((3, 11), build._supported_tags((3, 11)))
+
+    bio = io.BytesIO(PYPI_FILES_JSON)
+    with mock.patch.object(urllib.request, "urlopen", return_value=bio):
+        with mock.patch.object(subprocess, "call") as call:
+            assert build._pip_download(pkg, python, str(tmp_path)) is None
+
+    call.assert_not_called()
+
+
+def test_pypi_may_have_wheel():
+    build._fetch_pypi_files.cache_clear()
+    pkg = Package.make("a==1", {})
+    python = build.Python((3, 11), build._supported_tags((3, 11)))
+
+    bio = io.BytesIO(PYPI_FILES_JSON)
+    with mock.patch.object(urllib.request, "urlopen", return_value=bio):
+        assert build._pypi_may_have_wheel(pkg, python) is True
+
+
+def test_pypi_files_not_found():
+    build._fetch_pypi_files.cache_clear()
+    exc = urllib.error.HTTPError(
+        "https://e.com", 404, "Not Found", email.message.Message(), io.BytesIO()
+    )
+    with mock.patch.object(urllib.request, "urlopen", side_effect=exc) as urlopen:
+        assert build._pypi_files("a") == ()
+        assert build._pypi_files("a") == ()
+
+    urlopen.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "exc",
+    (
+        urllib.error.URLError("connection refused"),
+        urllib.error.HTTPError(
+            "https://e.com", 503, "Unavailable", email.message.Message(), io.BytesIO()
+        ),
+        TimeoutError(),
+        ConnectionResetError(),
+    ),
+)
+def test_pypi_files_transient_error_not_cached(exc):
+    build._fetch_pypi_files.cache_clear()
+    with mock.patch.object(urllib.request, "urlopen", side_effect=exc):
+        assert build._pypi_files("a") == ()
+
+    bio = io.BytesIO(PYPI_FILES_JSON)
+    with mock.patch.object(urllib.request, "urlopen", return_value=bio):
+        assert build._pypi_files("a") != ()
+
+
+def test_download_purelib(tmp_path):
+    build._fetch_pypi_files.cache_clear()
+    pkg = Package.make("a==1", {})
+    python = build.Python((3, 11), build._supported_tags((3, 11)))
+
+    responses = [io.BytesIO(PYPI_FILES_JSON), io.BytesIO(b"hello")]
+    with mock.patch.object(urllib.request, "urlopen", side_effect=responses):
+        ret = build._download_purelib(pkg, python, str(tmp_path))
+
+    assert ret == str(tmp_path.joinpath("a-1-py3-none-any.whl"))
+    assert tmp_path.joinpath("a-1-py3-none-any.whl").read_bytes() == b"hello"
+
+
+def test_download_purelib_requires_python_mismatch(tmp_path):
+    build._fetch_pypi_files.cache_clear()
+    pkg = Package.make("a==1", {})
+    python = build.Python((3, 11), build._supported_tags((3, 11)))
+
+    contents = PYPI_FILES_JSON.replace(
+        b'"url": "https://e.com/a-1-py3-none-any.whl",',
+        b'"url": "https://e.com/a-1-py3-none-any.whl", "requires-python": ">=3.12",',
+    )
+    bio = io.BytesIO(contents)
+    with mock.patch.object(urllib.request, "urlopen", return_value=bio):
+        assert build._download_purelib(pkg, python, str(tmp_path)) is None
+
+
+def test_download_sdist(tmp_path):
+    build._fetch_pypi_files.cache_clear()
+    pkg = Package.make("a==1", {})
+    dest = tmp_path.joinpath("sdist")
+
+    responses = [io.BytesIO(PYPI_FILES_JSON), io.BytesIO(b"sdist")]
+    with mock.patch.object(urllib.request, "urlopen", side_effect=responses):
+        ret = build._download_sdist(pkg, str(dest))
+
+    assert ret == str(dest.joinpath("a-1.tar.gz"))
+    assert dest.joinpath("a-1.tar.gz").read_bytes() == b"sdist"
+
+
+def test_download_sdist_version_mismatch(tmp_path):
+    build._fetch_pypi_files.cache_clear()
+    pkg = Package.make("a==2", {})
+
+    bio = io.BytesIO(PYPI_FILES_JSON)
+    with mock.patch.object(urllib.request, "urlopen", return_value=bio):
+        assert build._download_sdist(pkg, str(tmp_path)) is None
+
+
 def test_join_env_variable_not_present():
     ret = build._join_env(name="PATH", value="/some/dir", sep=":", env={})
     assert ret == "/some/dir"
@@ -320,6 +992,14 @@ def test_join_env_variable_present():
     assert ret == "/some/dir:/bin:/usr/bin"
 
 
+def test_env_updated_restores_only_touched_keys():
+    env = {"PATH": "/bin", "SOME": "VAR"}
+    with build._env_updated(env, {"PATH": "/prefix/bin:/bin", "NEW": "1"}):
+        assert env == {"PATH": "/prefix/bin:/bin", "SOME": "VAR", "NEW": "1"}
+        env["SOME"] = "CHANGED"
+    assert env == {"PATH": "/bin", "SOME": "CHANGED"}
+
+
 def test_prebuild_noop_without_command(tmp_path):
     pkg = Package.make("a==1", {})
     env = {"SOME": "VAR"}
@@ -331,15 +1011,16 @@ def test_prebuild_noop_without_command(tmp_path):
 def test_prebuild_runs_and_prefixes_path(tmp_path, capfd):
     pkg = Package.make("a==1", {"custom_prebuild": "echo arg"})
     env = {"SOME": "VAR"}
+    prefix = tmp_path.joinpath("prefix")
     with build._prebuild(pkg, str(tmp_path), env=env):
         assert env == {
             "SOME": "VAR",
-            "PATH": str(tmp_path.joinpath("prefix/bin")),
-            "CPPFLAGS": f"-I{tmp_path.joinpath('prefix/include')}",
-            "LDFLAGS": f"-L{tmp_path.joinpath('prefix/lib')}",
-            "LD_LIBRARY_PATH": str(tmp_path.joinpath("prefix/lib")),
-            "PKG_CONFIG_PATH": str(tmp_path.joinpath("prefix/lib/pkgconfig")),
+            "PATH": str(prefix.joinpath("bin")),
+            "CPPFLAGS": f"-I{prefix.joinpath('include')}",
+            "LDFLAGS": f"-L{prefix.joinpath('lib')}",
+            "LD_LIBRARY_PATH": str(prefix.joinpath("lib")),
+            "PKG_CONFIG_PATH": str(prefix.joinpath("lib/pkgconfig")),
         }
     assert env == {"SOME": "VAR"}
     out, _ = capfd.readouterr()
-    assert out == f"arg {tmp_path.joinpath('prefix')}\n"
+    assert out == f"arg {prefix}\n"
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import email.message
+import io
+import urllib.error
+import urllib.request
+from unittest import mock
+
+import pytest
+
+import caching
+
+
+@pytest.fixture(autouse=True)
+def _cache_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+
+def _response(body, **headers):
+    resp = mock.MagicMock()
+    resp.__enter__.return_value = resp
+    resp.read.return_value = body
+    resp.headers = email.message.Message()
+    for k, v in headers.items():
+        resp.headers[k] = v
+    return resp
+
+
+def _not_modified(url):
+    return urllib.error.HTTPError(
+        url, 304, "Not Modified", email.message.Message(), io.BytesIO()
+    )
+
+
+def test_fetch_no_cache():
+    with mock.patch.object(urllib.request, "urlopen", return_value=io.BytesIO(b"hi")):
+        assert caching.fetch("https://example.com/p") == b"hi"
+
+
+def test_fetch_revalidates_with_etag():
+    url = "https://example.com/p"
+    responses = [_response(b"hi", ETag='"1"'), _not_modified(url)]
+    with mock.patch.object(urllib.request, "urlopen", side_effect=responses) as m:
+        assert caching.fetch(url, cache=True) == b"hi"
+        assert caching.fetch(url, cache=True) == b"hi"
+
+    first_req = m.call_args_list[0].args[0]
+    assert first_req.get_header("If-none-match") is None
+    second_req = m.call_args_list[1].args[0]
+    assert second_req.get_header("If-none-match") == '"1"'
+
+
+def test_fetch_replaces_changed_body():
+    url = "https://example.com/p"
+    responses = [
+        _response(b"hi", ETag='"1"'),
+        _response(b"bye", ETag='"2"'),
+        _not_modified(url),
+    ]
+    with mock.patch.object(urllib.request, "urlopen", side_effect=responses):
+        assert caching.fetch(url, cache=True) == b"hi"
+        assert caching.fetch(url, cache=True) == b"bye"
+        assert caching.fetch(url, cache=True) == b"bye"
+
+
+def test_fetch_unexpected_not_modified_raises():
+    url = "https://example.com/p"
+    with mock.patch.object(urllib.request, "urlopen", side_effect=_not_modified(url)):
+        with pytest.raises(urllib.error.HTTPError):
+            caching.fetch(url, cache=True)
+
+
+def test_json_lines():
+    contents = b'{"filename": "a-1.whl"}\n\n{"filename": "b-2.whl"}\n'
+    assert caching.json_lines(contents) == [
+        {"filename": "a-1.whl"},
+        {"filename": "b-2.whl"},
+    ]
+
+
+def test_json_lines_empty():
+    assert caching.json_lines(b"") == []
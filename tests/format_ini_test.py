@@ -156,3 +156,27 @@ custom_prebuild = prebuild/crc32 1.1.2
 
     _, err = capsys.readouterr()
     assert err == ""
+
+
+def test_error_normalized_duplicate_sections(capsys, tmp_path):
+    ini = tmp_path.joinpath("f.ini")
+    ini.write_text("[Django==2.2.28]\n[django==2.2.28]\n")
+
+    assert format_ini.main((str(ini),)) == 1
+
+    assert ini.read_text() == "[Django==2.2.28]\n[django==2.2.28]\n"
+
+    _, err = capsys.readouterr()
+    assert err == f"{ini}: duplicate section [django==2.2.28]\n"
+
+
+def test_error_unparseable(capsys, tmp_path):
+    ini = tmp_path.joinpath("f.ini")
+    ini.write_text("[a==1]\napt_requires: libxml2-dev\n")
+
+    assert format_ini.main((str(ini),)) == 1
+
+    assert ini.read_text() == "[a==1]\napt_requires: libxml2-dev\n"
+
+    _, err = capsys.readouterr()
+    assert err == f"{ini}:2: invalid line: 'apt_requires: libxml2-dev'\n"
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import configparser
+
+import pytest
+
+import ini
+
+
+def test_parse_matches_configparser(tmp_path):
+    src = """\
+[a==1]
+
+[b==2]
+# a comment
+apt_requires =
+    pkg-config
+    libxml2-dev
+brew_requires = libxml2
+; another comment
+Python_Versions = <3.13
+"""
+    f = tmp_path.joinpath("f.ini")
+    f.write_text(src)
+
+    cfg = configparser.RawConfigParser()
+    cfg.read(f)
+    expected = {k: dict(cfg[k]) for k in cfg.sections()}
+
+    assert ini.parse(str(f)) == expected
+
+
+def test_parse_duplicate_section(tmp_path):
+    f = tmp_path.joinpath("f.ini")
+    f.write_text("[a==1]\n[a==1]\n")
+
+    with pytest.raises(ValueError) as excinfo:
+        ini.parse(str(f))
+
+    (msg,) = excinfo.value.args
+    assert msg == f"{f}:2: duplicate section [a==1]"
+
+
+def test_parse_key_outside_of_section(tmp_path):
+    f = tmp_path.joinpath("f.ini")
+    f.write_text("k = v\n")
+
+    with pytest.raises(ValueError) as excinfo:
+        ini.parse(str(f))
+
+    (msg,) = excinfo.value.args
+    assert msg == f"{f}:1: key outside of section"
+
+
+def test_parse_string_not_strict_merges_sections():
+    src = "[a==1]\nk = 1\n[a==1]\nk = 2\nj = 3\n"
+    assert ini.parse_string(src, strict=False) == {"a==1": {"k": "2", "j": "3"}}
+
+
+def test_parse_string_blank_lines_in_values():
+    src = "[a==1]\nk =\n    x\n\n    y\n\nj = 1\n"
+    cfg = configparser.RawConfigParser()
+    cfg.read_string(src)
+
+    assert ini.parse_string(src) == {"a==1": dict(cfg["a==1"])}
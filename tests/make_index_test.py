@@ -11,15 +11,16 @@ import re_assert
 
 import make_index
 
+UPLOADED_BY = re_assert.Matches(r"^git@[a-f0-9]{7}")
+
 
 def make_wheel(path, metadata):
     name, v, *_ = os.path.basename(path).split("-")
+    extra = "".join(f"{k}: {mv}\n" for k, mv in metadata)
+    contents = f"Name: {name}\nVersion: {v}\n{extra}".encode()
     with zipfile.ZipFile(path, "w") as zipf:
-        with zipf.open(f"{name}-{v}.dist-info/METADATA", "w") as f:
-            f.write(f"Name: {name}\n".encode())
-            f.write(f"Version: {v}\n".encode())
-            for k, v in metadata:
-                f.write(f"{k}: {v}\n".encode())
+        # ZipInfo keeps the 1980 timestamp so the wheel hashes are stable
+        zipf.writestr(zipfile.ZipInfo(f"{name}-{v}.dist-info/METADATA"), contents)
 
 
 def test_make_info_empty_wheel_metadata(tmp_path):
@@ -31,7 +32,7 @@ def test_make_info_empty_wheel_metadata(tmp_path):
         "filename": "a-1-py3-none-any.whl",
         "hash": "sha256=64f7f4664408d711c17ad28c1d3ba7dd155501e67c8632fafc8a525ba3ebc527",
         "upload_timestamp": mock.ANY,
-        "uploaded_by": re_assert.Matches(r"^git@[a-f0-9]{7}"),
+        "uploaded_by": UPLOADED_BY,
     }
 
 
@@ -58,10 +59,68 @@ def test_make_info_full_wheel_metadata(tmp_path):
         ],
         "requires_python": ">= 3.7, != 3.7.0",
         "upload_timestamp": mock.ANY,
-        "uploaded_by": re_assert.Matches(r"^git@[a-f0-9]{7}"),
+        "uploaded_by": UPLOADED_BY,
+    }
+
+
+def test_headers_stops_at_description():
+    contents = b"""\
+Name: a
+Requires-Dist: b
+requires-python: >=3.8
+Summary: folded
+  summary
+
+Requires-Dist: not-a-header
+"""
+    assert make_index._headers(io.BytesIO(contents)) == {
+        "name": ["a"],
+        "requires-dist": ["b"],
+        "requires-python": [">=3.8"],
+        "summary": ["folded\n  summary"],
     }
 
 
+def test_files_sorted_per_directory(tmp_path):
+    tmp_path.joinpath("b").mkdir()
+    tmp_path.joinpath("b/z.whl").touch()
+    tmp_path.joinpath("b/y.whl").touch()
+    tmp_path.joinpath("a.whl").touch()
+
+    assert list(make_index._files(str(tmp_path))) == [
+        ("a.whl", str(tmp_path.joinpath("a.whl"))),
+        ("y.whl", str(tmp_path.joinpath("b/y.whl"))),
+        ("z.whl", str(tmp_path.joinpath("b/z.whl"))),
+    ]
+
+
+def test_files_sorted_as_full_paths(tmp_path):
+    tmp_path.joinpath("dist-linux").mkdir()
+    tmp_path.joinpath("dist-linux/b.whl").touch()
+    tmp_path.joinpath("dist-linux-arm64").mkdir()
+    tmp_path.joinpath("dist-linux-arm64/a.whl").touch()
+
+    assert list(make_index._files(str(tmp_path))) == [
+        ("a.whl", str(tmp_path.joinpath("dist-linux-arm64/a.whl"))),
+        ("b.whl", str(tmp_path.joinpath("dist-linux/b.whl"))),
+    ]
+
+
+def test_files_missing_directory(tmp_path):
+    assert list(make_index._files(str(tmp_path.joinpath("dist")))) == []
+
+
+def test_files_does_not_follow_directory_symlinks(tmp_path):
+    tmp_path.joinpath("a").mkdir()
+    tmp_path.joinpath("a/a.whl").touch()
+    # a cycle would otherwise recurse forever
+    tmp_path.joinpath("a/loop").symlink_to(tmp_path)
+
+    assert list(make_index._files(str(tmp_path))) == [
+        ("a.whl", str(tmp_path.joinpath("a/a.whl"))),
+    ]
+
+
 def test_main_new_package(tmp_path):
     dist = tmp_path.joinpath("dist")
     dist.mkdir()
@@ -84,6 +143,26 @@ def test_main_new_package(tmp_path):
     assert dest.joinpath("simple/a/index.html").exists()
 
 
+def test_main_copies_when_link_fails(tmp_path):
+    dist = tmp_path.joinpath("dist")
+    dist.mkdir()
+    make_wheel(dist.joinpath("a-1-py3-none-any.whl"), ())
+    dest = tmp_path.joinpath("dest")
+
+    bio = io.BytesIO(b"")
+    with mock.patch.object(urllib.request, "urlopen", return_value=bio):
+        with mock.patch.object(os, "link", side_effect=OSError):
+            assert not make_index.main(
+                (
+                    f"--dist={dist}",
+                    f"--dest={dest}",
+                    "--pypi-url=http://example.com",
+                )
+            )
+
+    assert dest.joinpath("wheels/a-1-py3-none-any.whl").exists()
+
+
 def test_main_multiple_provide_same_package_first_wins(tmp_path):
     dist = tmp_path.joinpath("dist")
     adir = dist.joinpath("a")
@@ -38,3 +38,21 @@ def test_upgrade_needs_to_upgrade_things(tmp_path, capsys):
 
     out, _ = capsys.readouterr()
     assert out == "upgrading a...\n"
+
+
+def test_upgrade_keeps_packages_ini_order(tmp_path, capsys):
+    packages_ini = tmp_path.joinpath("packages.ini")
+    packages_ini.write_text("[c==1.0]\n[a==2.0]\n[b==1.0]\n")
+
+    def _urlopen(url):
+        return io.BytesIO(b'{"info": {"version": "2.0"}}')
+
+    ret: subprocess.CompletedProcess[None]
+    ret = subprocess.CompletedProcess(("add_pkg",), returncode=0)
+    with mock.patch.object(urllib.request, "urlopen", side_effect=_urlopen):
+        with mock.patch.object(subprocess, "run", return_value=ret) as run:
+            assert upgrade_all.main((f"--packages-ini={packages_ini}",)) == 0
+
+    out, _ = capsys.readouterr()
+    assert out == "upgrading c, b...\n"
+    assert run.call_args[1]["input"] == b"c\nb"
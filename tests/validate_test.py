@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import os.path
+import subprocess
+import sys
 import zipfile
+from unittest import mock
 
 import pytest
 from packaging.tags import parse_tag
@@ -69,6 +73,12 @@ def test_pythons_to_check_specific_cpython_tag():
     assert ret == ("python3.11",)
 
 
+def test_pythons_to_check_cached():
+    # most wheels share the same few tag sets
+    ret = validate._pythons_to_check(parse_tag("py3-none-any"))
+    assert validate._pythons_to_check(parse_tag("py3-none-any")) is ret
+
+
 def test_top_imports_record(tmp_path):
     whl = tmp_path.joinpath("distlib.whl")
     with zipfile.ZipFile(whl, "w") as zipf:
@@ -87,3 +97,121 @@ def test_top_imports_record(tmp_path):
 
     expected = ["distlib", "_distlib_backend", "distlib_top"]
     assert validate._top_imports(str(whl)) == expected
+
+
+def test_run_captures_output():
+    output: list[str] = []
+    validate._run((sys.executable, "-c", "print('hi')"), log=output.append)
+    assert output == ["hi"]
+
+
+def test_run_logs_output_before_raising():
+    output: list[str] = []
+    cmd = (sys.executable, "-c", "raise SystemExit('bye')")
+    with pytest.raises(subprocess.CalledProcessError):
+        validate._run(cmd, log=output.append)
+    assert output == ["bye"]
+
+
+def test_main_prints_output_in_order(tmp_path, capsys):
+    packages_ini = tmp_path.joinpath("packages.ini")
+    packages_ini.write_text("[a==1]\n[b==1]\nvalidate_skip_imports = b\n")
+    dist = tmp_path.joinpath("dist")
+    dist.mkdir()
+    for filename in ("a-1-py3-none-any.whl", "b-1-cp312-cp312-manylinux1_x86_64.whl"):
+        name, version, _ = filename.split("-", 2)
+        with zipfile.ZipFile(dist.joinpath(filename), "w") as zipf:
+            record = f"{name}/__init__.py,,\n".encode()
+            zipf.writestr(f"{name}-{version}.dist-info/RECORD", record)
+
+    def _validate(
+        *, python, seed, filename, info, imports, index_url, pip_cache_dir, log
+    ):
+        assert os.path.basename(seed) == python
+        log(f"{python}: {os.path.basename(filename)} {imports}")
+
+    with mock.patch.object(validate, "_make_venv") as make_venv:
+        with mock.patch.object(validate, "_validate", _validate):
+            ret = validate.main(
+                (
+                    "--index-url=http://example.com/simple",
+                    f"--dist={dist}",
+                    f"--packages-ini={packages_ini}",
+                    "--jobs=4",
+                )
+            )
+    assert ret == 0
+
+    out, _ = capsys.readouterr()
+    assert out == (
+        "python3.11: a-1-py3-none-any.whl ('a',)\n"
+        "python3.12: a-1-py3-none-any.whl ('a',)\n"
+        "python3.13: a-1-py3-none-any.whl ('a',)\n"
+        "python3.12: b-1-cp312-cp312-manylinux1_x86_64.whl ()\n"
+    )
+    # one virtualenv per python, copied for each validation
+    assert sorted(c[0][0] for c in make_venv.call_args_list) == [
+        "python3.11",
+        "python3.12",
+        "python3.13",
+    ]
+
+
+def test_import_all():
+    cmd = (sys.executable, "-c", validate.IMPORT_ALL, "json", "email.parser")
+    assert subprocess.call(cmd) == 0
+    cmd = (sys.executable, "-c", validate.IMPORT_ALL, "json", "does_not_exist")
+    assert subprocess.call(cmd, stderr=subprocess.DEVNULL) == 1
+
+
+@pytest.mark.parametrize(
+    ("name", "expected"),
+    (
+        ("distlib-0.3.4.dist-info/RECORD", True),
+        ("distlib-0.3.4.dist-info/METADATA", False),
+        ("distlib/RECORD", False),
+        ("distlib/distlib-0.3.4.dist-info/RECORD", False),
+        ("distlib-0.3.4.dist-info/RECORD/x", False),
+    ),
+)
+def test_is_record(name, expected):
+    assert validate._is_record(name) is expected
+
+
+def test_top_imports_record_from_wheel_filename(tmp_path):
+    whl = tmp_path.joinpath("a-1-py3-none-any.whl")
+    with zipfile.ZipFile(whl, "w") as zipf:
+        zipf.writestr("a-1.dist-info/RECORD", b"a/__init__.py,,\n")
+        # would be found by the fallback search if it were used
+        zipf.writestr("b-1.dist-info/RECORD", b"b/__init__.py,,\n")
+
+    assert validate._top_imports(str(whl)) == ["a"]
+
+
+def test_top_imports_needs_record(tmp_path):
+    whl = tmp_path.joinpath("distlib.whl")
+    with zipfile.ZipFile(whl, "w") as zipf:
+        zipf.writestr("distlib-0.3.4.dist-info/METADATA", b"")
+
+    with pytest.raises(NotImplementedError):
+        validate._top_imports(str(whl))
+
+
+def test_main_packages_ini_not_found(tmp_path):
+    packages_ini = tmp_path.joinpath("packages.ini")
+    argv = ("--index-url=http://example.com/simple", f"--packages-ini={packages_ini}")
+    with pytest.raises(SystemExit) as excinfo:
+        validate.main(argv)
+    (msg,) = excinfo.value.args
+    assert msg == f"{packages_ini}: not found"
+
+
+@pytest.mark.parametrize("jobs", ("0", "-1"))
+def test_main_jobs_must_be_positive(capsys, jobs):
+    argv = ("--index-url=http://example.com/simple", f"--jobs={jobs}")
+    with pytest.raises(SystemExit) as excinfo:
+        validate.main(argv)
+    assert excinfo.value.code == 2
+
+    _, err = capsys.readouterr()
+    assert err.endswith("error: --jobs must be at least 1\n")
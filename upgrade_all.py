@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
 import configparser
 import json
 import subprocess
@@ -9,6 +10,11 @@ import urllib.request
 from collections.abc import Sequence
 
 
+def _latest_version(name: str) -> str:
+    resp = urllib.request.urlopen(f"https://pypi.org/pypi/{name}/json")
+    return json.load(resp)["info"]["version"]
+
+
 def main(argv: Sequence[str] | None = None) -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--packages-ini", default="packages.ini")
@@ -18,12 +24,12 @@ def main(argv: Sequence[str] | None = None) -> int:
     assert cfg.read(args.packages_ini)
     pkgs_latest = dict(k.split("==", 1) for k in cfg.sections())
 
-    todo = []
-    for k, v in pkgs_latest.items():
-        resp = urllib.request.urlopen(f"https://pypi.org/pypi/{k}/json")
-        contents = json.load(resp)
-        if contents["info"]["version"] != v:
-            todo.append(k)
+    # network bound: look up all of the packages concurrently
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        latest = executor.map(_latest_version, pkgs_latest)
+        todo = [
+            k for (k, v), version in zip(pkgs_latest.items(), latest) if version != v
+        ]
 
     if todo:
         print(f"upgrading {', '.join(todo)}...")
@@ -1,22 +1,32 @@
 from __future__ import annotations
 
 import argparse
-import configparser
+import concurrent.futures
+import contextlib
+import functools
 import os.path
-import re
+import shutil
 import subprocess
 import sys
 import tempfile
 import zipfile
+from collections.abc import Callable
 from collections.abc import Mapping
+from collections.abc import Sequence
 from typing import NamedTuple
 
 from packaging.tags import Tag
 from packaging.utils import parse_wheel_filename
 from packaging.version import Version
 
+import ini
+
 PYTHONS = ((3, 11), (3, 12), (3, 13))
-DIST_INFO_RE = re.compile(r"^[^/]+.dist-info/[^/]+$")
+IMPORT_ALL = """\
+import sys
+for mod in sys.argv[1:]:
+    __import__(mod)
+"""
 
 
 class Info(NamedTuple):
@@ -43,6 +53,7 @@ def _py_exe(major: int, minor: int) -> str:
     return f"python{major}.{minor}"
 
 
+@functools.cache
 def _pythons_to_check(tags: frozenset[Tag]) -> tuple[str, ...]:
     ret: set[str] = set()
     for tag in tags:
@@ -64,67 +75,99 @@ def _pythons_to_check(tags: frozenset[Tag]) -> tuple[str, ...]:
         return tuple(sorted(ret))
 
 
+def _is_record(name: str) -> bool:
+    # `{dist}-{version}.dist-info/RECORD`
+    dist_info, _, basename = name.partition("/")
+    return basename == "RECORD" and dist_info.endswith(".dist-info")
+
+
 def _top_imports(whl: str) -> list[str]:
+    # the .dist-info directory is named for the wheel's `{dist}-{version}`
+    dist_version = "-".join(os.path.basename(whl).split("-")[:2])
     with zipfile.ZipFile(whl) as zipf:
-        dist_info_names = {
-            os.path.basename(name): name
-            for name in zipf.namelist()
-            if DIST_INFO_RE.match(name)
-        }
-        if "RECORD" in dist_info_names:
-            with zipf.open(dist_info_names["RECORD"]) as f:
-                pkgs = {}
-                for line_b in f:
-                    fname = line_b.decode().split(",")[0]
-                    if fname.endswith("/__init__.py"):
-                        pkgs[fname.split("/")[0]] = 1
-                    elif "/" not in fname and fname.endswith((".so", ".py")):
-                        pkgs[fname.split(".")[0]] = 1
-                return list(pkgs)
-        else:
-            raise NotImplementedError("need RECORD")
+        try:
+            contents = zipf.read(f"{dist_version}.dist-info/RECORD")
+        except KeyError:
+            # .dist-info is conventionally last in the archive: search backwards
+            for name in reversed(zipf.namelist()):
+                if _is_record(name):
+                    break
+            else:
+                raise NotImplementedError("need RECORD")
+            contents = zipf.read(name)
+
+    # stays in bytes: only the (few) names which match are decoded
+    pkgs = {}
+    for line in contents.splitlines():
+        fname = line.partition(b",")[0]
+        if fname.endswith(b"/__init__.py"):
+            pkgs[fname.partition(b"/")[0].decode()] = 1
+        elif b"/" not in fname and fname.endswith((b".so", b".py")):
+            pkgs[fname.partition(b".")[0].decode()] = 1
+    return list(pkgs)
+
+
+def _run(cmd: tuple[str, ...], *, log: Callable[[str], None]) -> None:
+    # output is captured so concurrent validations do not interleave
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    if proc.stdout:
+        log(proc.stdout.decode(errors="replace").rstrip("\n"))
+    proc.check_returncode()
+
+
+def _make_venv(python: str, venv: str, *, log: Callable[[str], None]) -> None:
+    _run(
+        (
+            sys.executable,
+            "-mvirtualenv",
+            "--no-periodic-update",
+            "--pip=embed",
+            "--setuptools=embed",
+            "--wheel=embed",
+            "--quiet",
+            f"--python={python}",
+            venv,
+        ),
+        log=log,
+    )
 
 
 def _validate(
     *,
     python: str,
+    seed: str,
     filename: str,
     info: Info,
+    imports: tuple[str, ...],
     index_url: str,
+    pip_cache_dir: str,
+    log: Callable[[str], None] = print,
 ) -> None:
-    print(f"validating {python}: {filename}")
+    log(f"validating {python}: {filename}")
     with tempfile.TemporaryDirectory() as tmpdir:
-        print("creating env")
+        log("creating env")
         venv = os.path.join(tmpdir, "venv")
         py = os.path.join(venv, "bin", "python")
 
-        subprocess.check_call(
-            (
-                sys.executable,
-                "-mvirtualenv",
-                "--no-periodic-update",
-                "--pip=embed",
-                "--setuptools=embed",
-                "--wheel=embed",
-                "--quiet",
-                f"--python={python}",
-                venv,
-            )
-        )
+        # a copy of the pristine `seed` venv.  its bin/pip*, bin/wheel and
+        # bin/activate* still hardcode the seed's path -- this only works
+        # because everything below runs `py -mpip` (bin/python links to the
+        # base interpreter), never those scripts
+        shutil.copytree(seed, venv, symlinks=True)
 
-        print("=> installing")
+        log("=> installing")
         if info.validate_extras is not None:
             install_target = f"{filename}[{info.validate_extras}]"
         else:
             install_target = filename
 
-        subprocess.check_call(
+        _run(
             (
                 py,
                 "-mpip",
                 "install",
                 "--quiet",
-                "--no-cache-dir",
+                f"--cache-dir={pip_cache_dir}",
                 "--disable-pip-version-check",
                 "--only-binary=:all:",
                 f"--index-url={index_url}",
@@ -132,41 +175,100 @@ def _validate(
                 f"--find-links={os.path.dirname(filename)}",
                 install_target,
                 *info.validate_incorrect_missing_deps,
-            )
+            ),
+            log=log,
         )
 
-        print("=> importing")
-        for s in _top_imports(filename):
-            if s not in info.validate_skip_imports:
-                subprocess.check_call((py, "-c", f"__import__({s!r})"))
+        log("=> importing")
+        if imports:
+            # one interpreter for all of them: startup dwarfs most imports
+            _run((py, "-c", IMPORT_ALL, *imports), log=log)
 
 
-def main() -> int:
+def main(argv: Sequence[str] | None = None) -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--index-url", required=True)
     parser.add_argument("--dist", default="dist")
     parser.add_argument("--packages-ini", default="packages.ini")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=4,
+        help="number of concurrent validations, 1 validates serially",
+    )
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
 
-    cfg = configparser.ConfigParser()
-    if not cfg.read(args.packages_ini):
+    try:
+        cfg = ini.parse(args.packages_ini)
+    except FileNotFoundError:
         raise SystemExit(f"{args.packages_ini}: not found")
 
     packages = {}
-    for k in cfg.sections():
+    for k, v in cfg.items():
         pkg, _, version_s = k.partition("==")
-        packages[(pkg, Version(version_s))] = Info.from_dct(cfg[k])
+        packages[(pkg, Version(version_s))] = Info.from_dct(v)
+
+    with os.scandir(args.dist) as it:
+        entries = sorted((entry.name, entry.path) for entry in it)
 
-    for filename in sorted(os.listdir(args.dist)):
+    todo = []
+    for filename, path in entries:
         name, version, _, wheel_tags = parse_wheel_filename(filename)
         info = packages[(name, version)]
+        # read once per wheel rather than once per python
+        imports = tuple(
+            s for s in _top_imports(path) if s not in info.validate_skip_imports
+        )
         for python in _pythons_to_check(wheel_tags):
-            _validate(
+            todo.append((python, path, info, imports))
+
+    with contextlib.ExitStack() as ctx:
+        # creating a virtualenv is slow: create one per python and copy it
+        seeds_dir = ctx.enter_context(tempfile.TemporaryDirectory())
+        # validations share dependencies: download each one once per run
+        pip_cache_dir = ctx.enter_context(tempfile.TemporaryDirectory())
+        # each validation is independent (its own virtualenv) and is spent
+        # waiting on subprocesses -- run them on threads, output in order
+        executor = ctx.enter_context(concurrent.futures.ThreadPoolExecutor(args.jobs))
+
+        seeds = {
+            python: os.path.join(seeds_dir, python)
+            for python in sorted({python for python, _, _, _ in todo})
+        }
+        seed_futures = [
+            executor.submit(_make_venv, python, seed, log=print)
+            for python, seed in seeds.items()
+        ]
+        for seed_future in seed_futures:
+            seed_future.result()
+
+        futures = []
+        for python, filename, info, imports in todo:
+            output: list[str] = []
+            future = executor.submit(
+                _validate,
                 python=python,
-                filename=os.path.join(args.dist, filename),
+                seed=seeds[python],
+                filename=filename,
                 info=info,
+                imports=imports,
                 index_url=args.index_url,
+                pip_cache_dir=pip_cache_dir,
+                log=output.append,
             )
+            futures.append((output, future))
+
+        for output, future in futures:
+            try:
+                future.result()
+            except BaseException:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            finally:
+                for line in output:
+                    print(line)
 
     return 0
 